@@ -10,30 +10,422 @@ import os
 import argparse
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import hashlib
+import re
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
 
-# .envファイルから環境変数を読み込む
-load_dotenv()
-
 # API バージョン
 API_VERSION = "2024-11-01-Preview"
 DEFAULT_PDF_INDEX_NAME = "pdf-docs-index"
 DEFAULT_CONTAINER_NAME = "documents"
 
+# インデクサーのバッチサイズ
+# 1バッチのペイロードは16MBが上限のため、本文と翻訳結果（6言語分）を含むスキルセット使用時は小さくする
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_SKILLSET_BATCH_SIZE = 10
+DEFAULT_MAX_FAILED_ITEMS = 10
+DEFAULT_MAX_FAILED_ITEMS_PER_BATCH = 5
+
+# インデックス・スキルセット・データソース・インデクサーの定義テンプレートの格納先
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+# クライアント側の定義検証で使用する既知の型
+SEARCH_FIELD_TYPES = {
+    "Edm.String", "Edm.Int32", "Edm.Int64", "Edm.Double", "Edm.Boolean", "Edm.DateTimeOffset",
+    "Edm.GeographyPoint", "Edm.ComplexType", "Edm.Single", "Edm.Half", "Edm.Int16", "Edm.SByte", "Edm.Byte"
+}
+SKILL_TYPES = {
+    "#Microsoft.Skills.Text.SplitSkill",
+    "#Microsoft.Skills.Text.MergeSkill",
+    "#Microsoft.Skills.Text.LanguageDetectionSkill",
+    "#Microsoft.Skills.Text.KeyPhraseExtractionSkill",
+    "#Microsoft.Skills.Text.TranslationSkill",
+    "#Microsoft.Skills.Text.V3.EntityRecognitionSkill",
+    "#Microsoft.Skills.Text.V3.SentimentSkill",
+    "#Microsoft.Skills.Text.PIIDetectionSkill",
+    "#Microsoft.Skills.Text.AzureOpenAIEmbeddingSkill",
+    "#Microsoft.Skills.Vision.OcrSkill",
+    "#Microsoft.Skills.Vision.ImageAnalysisSkill",
+    "#Microsoft.Skills.Util.ConditionalSkill",
+    "#Microsoft.Skills.Util.ShaperSkill",
+    "#Microsoft.Skills.Util.DocumentExtractionSkill",
+    "#Microsoft.Skills.Util.DocumentIntelligenceLayoutSkill",
+    "#Microsoft.Skills.Custom.WebApiSkill"
+}
+
+# 翻訳先の言語コードと翻訳元の言語コード（None の場合は自動検出）
+LANGUAGES = [
+    ("en", None),
+    ("ja", "en"),
+    ("fr", "en"),
+    ("es", "en"),
+    ("de", "en"),
+    ("zh-Hans", "en"),
+]
+
 # ロガーの設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Azure への各リクエストの構造化トレース（--trace 指定時のみ JSON で出力）
+TRACE_FIELDS = ("phase", "method", "url", "status", "latency_ms", "throttled", "retries", "error")
+trace_logger = logging.getLogger(f"{__name__}.trace")
+trace_logger.propagate = False
+trace_logger.setLevel(logging.WARNING)
+
+class JsonTraceFormatter(logging.Formatter):
+    """トレースレコードを1行のJSONとして整形"""
+    def format(self, record):
+        event = {"time": self.formatTime(record), "event": record.getMessage()}
+        event.update({field: getattr(record, field) for field in TRACE_FIELDS if hasattr(record, field)})
+        return json.dumps(event, ensure_ascii=False)
+
+def enable_trace():
+    """構造化トレースの出力を有効にする"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonTraceFormatter())
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+
+# Azure AI Search への接続を使い回すための共有セッション（keep-alive / コネクションプール）
+# スロットリング（429）や一時的なサーバーエラーはアダプター側で Retry-After を尊重して再試行する
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "PUT", "POST", "DELETE"],
+        respect_retry_after_header=True
+    )
+))
+
+# 再試行しても解消しなかった通信エラー
+REQUEST_ERRORS = (requests.exceptions.RetryError, requests.exceptions.ConnectionError)
+
+# エラーログに出力するレスポンス本文の最大文字数
+ERROR_TEXT_LIMIT = 2048
+
+# インデックスに付随する各リソースのURL
+SearchResourceUrls = namedtuple(
+    "SearchResourceUrls",
+    ["index", "indexer", "skillset", "datasource", "indexer_run", "indexer_status"]
+)
+
+# インデクサーの実行開始時刻を比較する際に許容する、サービスとの時計のずれ
+INDEXER_CLOCK_SKEW = timedelta(seconds=5)
+# 実行結果の開始時刻（"2025-03-24T05:12:30.1234567Z" など）の小数秒部分
+FRACTIONAL_SECONDS_PATTERN = re.compile(r"\.(\d+)")
+
+# 作成済みリソースの定義ハッシュとETagを保存するファイル（再実行時の変更検出用）
+RESOURCE_STATE_PATH = Path.home() / ".cache" / "create_pdf_index" / "resource_state.json"
+# 読み込みと更新（読み込み→書き込み）の両方で取得する（更新中に読み込みを行うため再入可能なロック）
+RESOURCE_STATE_LOCK = threading.RLock()
+
+@lru_cache(maxsize=1)
+def get_search_endpoint():
+    """Azure AI Search のエンドポイントを取得（初回のみ環境変数を参照）"""
+    return os.environ.get("AZURE_SEARCH_ENDPOINT")
+
+@lru_cache(maxsize=1)
 def get_search_headers():
-    """検索APIリクエスト用のヘッダーを取得"""
+    """検索APIリクエスト用のヘッダーを取得（初回のみ構築）"""
     api_key = os.environ["AZURE_SEARCH_ADMIN_KEY"]
     return {
         "Content-Type": "application/json",
         "api-key": api_key
     }
 
+def discard_response_body(response):
+    """レスポンス本文をデコードせずに読み捨て、接続をプールに返却（stream=True のレスポンス用）"""
+    response.raw.drain_conn()
+    response.raw.release_conn()
+
+def error_text(response):
+    """エラーログ用にレスポンス本文を切り詰めて取得"""
+    return response.text[:ERROR_TEXT_LIMIT]
+
+def search_request(method, url, **kwargs):
+    """共有セッションでリクエストを送信し、フェーズ・ステータス・レイテンシをトレースに記録"""
+    start = time.perf_counter()
+    try:
+        response = SESSION.request(method, url, **kwargs)
+    except REQUEST_ERRORS as e:
+        if trace_logger.isEnabledFor(logging.INFO):
+            # 再試行を使い切って失敗した呼び出し（スロットリングが続いた場合など）も記録する
+            # ステータスは例外にレスポンスが付いている場合のみ記録し、分からなければ null とする
+            status = e.response.status_code if e.response is not None else None
+            trace_logger.info("azure_call", extra={
+                "phase": "azure_response",
+                "method": method,
+                "url": url,
+                "status": status,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+                "throttled": status == 429 if status is not None else None,
+                "error": str(e)
+            })
+        raise
+    if trace_logger.isEnabledFor(logging.INFO):
+        # アダプター内で再試行されたレスポンスも含めてスロットリングを判定する
+        retry_history = response.raw.retries.history if response.raw.retries else ()
+        trace_logger.info("azure_call", extra={
+            "phase": "azure_response",
+            "method": method,
+            "url": url,
+            "status": response.status_code,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "throttled": response.status_code == 429 or any(h.status == 429 for h in retry_history),
+            "retries": len(retry_history)
+        })
+    return response
+
+def warm_up_connection(endpoint):
+    """並列リクエストの前に1回だけ軽量なリクエストを送り、DNS解決とTLS接続を済ませておく"""
+    try:
+        with search_request("GET", f"{endpoint}/servicestats?api-version={API_VERSION}", stream=True) as response:
+            discard_response_body(response)
+    except REQUEST_ERRORS as e:
+        logger.debug("接続のウォームアップに失敗しました: %s", e)
+
+def build_resource_urls(endpoint, index_name):
+    """インデックス名から各リソースのURLを一度だけ構築"""
+    indexer_url = f"{endpoint}/indexers/{index_name}-indexer"
+    return SearchResourceUrls(
+        index=f"{endpoint}/indexes/{index_name}?api-version={API_VERSION}",
+        indexer=f"{indexer_url}?api-version={API_VERSION}",
+        skillset=f"{endpoint}/skillsets/{index_name}-skillset?api-version={API_VERSION}",
+        datasource=f"{endpoint}/datasources/{index_name}-datasource?api-version={API_VERSION}",
+        indexer_run=f"{indexer_url}/run?api-version={API_VERSION}",
+        indexer_status=f"{indexer_url}/status?api-version={API_VERSION}"
+    )
+
+def load_resource_state():
+    """保存済みのリソース定義ハッシュとETagを読み込む"""
+    with RESOURCE_STATE_LOCK:
+        try:
+            with open(RESOURCE_STATE_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+def update_resource_state(url, entry):
+    """リソース定義ハッシュとETagを保存（entry が None の場合は削除）"""
+    with RESOURCE_STATE_LOCK:
+        state = load_resource_state()
+        if entry is None:
+            state.pop(url, None)
+        else:
+            state[url] = entry
+        try:
+            # 一時ファイルに書き込んでから置き換え、書き込み途中の内容を読まれたり中断で壊れたりしないようにする
+            RESOURCE_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = RESOURCE_STATE_PATH.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            tmp_path.replace(RESOURCE_STATE_PATH)
+        except OSError as e:
+            logger.warning("⚠️ リソース状態ファイルを保存できませんでした: %s", e)
+
+def is_resource_unchanged(url, digest):
+    """前回作成時と定義が同じで、サービス側でも変更されていないかを確認"""
+    entry = load_resource_state().get(url)
+    if not entry or entry.get("hash") != digest or not entry.get("etag"):
+        return False
+
+    with search_request("GET", url, headers={"If-None-Match": entry["etag"]}, stream=True) as response:
+        unchanged = response.status_code == 304 or (
+            response.status_code == 200 and response.headers.get("ETag") == entry["etag"]
+        )
+        discard_response_body(response)
+        return unchanged
+
+def put_search_resource(url, payload, resource_label, resource_name):
+    """検索リソースを作成・更新（定義とETagが前回と同じ場合はスキップ）"""
+    digest = hashlib.sha256(payload).hexdigest()
+    try:
+        if is_resource_unchanged(url, digest):
+            logger.info("✅ %s '%s' は変更がないため更新をスキップしました", resource_label, resource_name)
+            return True
+
+        # 前回作成時のETagを指定し、他の操作による変更を上書きしないようにする
+        entry = load_resource_state().get(url)
+        headers = {"If-Match": entry["etag"]} if entry and entry.get("etag") else {}
+        while True:
+            with search_request("PUT", url, data=payload, headers=headers, stream=True) as response:
+                if response.status_code == 412 and headers:
+                    # 他の操作で更新されていた場合は、条件なしで1回だけ再試行する
+                    logger.warning("⚠️  %s '%s' は他の操作で更新されています。定義を上書きします", resource_label, resource_name)
+                    headers = {}
+                    continue
+                if response.status_code == 201 or response.status_code == 200:
+                    update_resource_state(url, {"hash": digest, "etag": response.headers.get("ETag")})
+                    logger.info("✅ %s '%s' を作成しました", resource_label, resource_name)
+                    discard_response_body(response)
+                    return True
+                logger.error("⚠️  %s '%s' の作成に失敗: %s", resource_label, resource_name, error_text(response))
+                return False
+    except REQUEST_ERRORS as e:
+        logger.error("⚠️ %s作成エラー: %s", resource_label, e)
+        return False
+
+@lru_cache(maxsize=4)
+def read_template(template_name):
+    """定義テンプレート（JSON）を読み込む（ファイルの読み込みは初回のみ）"""
+    return (TEMPLATE_DIR / f"{template_name}.json").read_bytes()
+
+def load_template(template_name):
+    """定義テンプレートから新しい定義を作成"""
+    return json.loads(read_template(template_name))
+
+def validate_index_definition(definition):
+    """インデックス定義を検証し、エラーメッセージの一覧を返す"""
+    errors = []
+    fields = definition.get("fields")
+    if not isinstance(fields, list) or not fields:
+        return ["fields が空です"]
+
+    profiles = {profile.get("name") for profile in definition.get("vectorSearch", {}).get("profiles", [])}
+    names = set()
+    key_count = 0
+    for field in fields:
+        name = field.get("name")
+        if not name:
+            errors.append("name のないフィールドがあります")
+            continue
+        if name in names:
+            errors.append(f"フィールド '{name}' が重複しています")
+        names.add(name)
+
+        field_type = field.get("type", "")
+        base_type = field_type[len("Collection("):-1] if field_type.startswith("Collection(") and field_type.endswith(")") else field_type
+        if base_type not in SEARCH_FIELD_TYPES:
+            errors.append(f"フィールド '{name}' の型 '{field_type}' は不正です")
+        if field.get("key"):
+            key_count += 1
+        if "dimensions" in field and field.get("vectorSearchProfile") not in profiles:
+            errors.append(f"フィールド '{name}' のベクトル検索プロファイル '{field.get('vectorSearchProfile')}' が定義されていません")
+
+    if key_count != 1:
+        errors.append(f"キーフィールドは1つである必要があります（{key_count}個）")
+    return errors
+
+def validate_skillset_definition(definition):
+    """スキルセット定義を検証し、エラーメッセージの一覧を返す"""
+    errors = []
+    skills = definition.get("skills")
+    if not isinstance(skills, list) or not skills:
+        return ["skills が空です"]
+
+    target_names = set()
+    for i, skill in enumerate(skills):
+        skill_type = skill.get("@odata.type")
+        if skill_type not in SKILL_TYPES:
+            errors.append(f"スキル[{i}] の @odata.type '{skill_type}' は不明です")
+        if skill_type == "#Microsoft.Skills.Custom.WebApiSkill" and not skill.get("uri"):
+            errors.append(f"スキル[{i}] に uri が設定されていません")
+        for skill_input in skill.get("inputs", []):
+            if not skill_input.get("name") or not skill_input.get("source", "").startswith("/document"):
+                errors.append(f"スキル[{i}] の入力 {skill_input} が不正です")
+        if not skill.get("outputs"):
+            errors.append(f"スキル[{i}] に outputs がありません")
+        for output in skill.get("outputs", []):
+            target_name = output.get("targetName")
+            if not output.get("name") or not target_name:
+                errors.append(f"スキル[{i}] の出力 {output} が不正です")
+            elif target_name in target_names:
+                errors.append(f"出力先 '{target_name}' が重複しています")
+            target_names.add(target_name)
+
+    if not definition.get("cognitiveServices", {}).get("key"):
+        errors.append("Cognitive Services のキーが設定されていません")
+    return errors
+
+def validate_datasource_definition(definition):
+    """データソース定義を検証し、エラーメッセージの一覧を返す"""
+    errors = []
+    if not definition.get("type"):
+        errors.append("type が設定されていません")
+    if not definition.get("credentials", {}).get("connectionString"):
+        errors.append("接続文字列が設定されていません")
+    if not definition.get("container", {}).get("name"):
+        errors.append("コンテナ名が設定されていません")
+    return errors
+
+def validate_indexer_definition(definition):
+    """インデクサー定義を検証し、エラーメッセージの一覧を返す"""
+    errors = []
+    for key in ("dataSourceName", "targetIndexName"):
+        if not definition.get(key):
+            errors.append(f"{key} が設定されていません")
+
+    batch_size = definition.get("parameters", {}).get("batchSize")
+    if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+        errors.append(f"batchSize '{batch_size}' は1以上の整数である必要があります")
+
+    for mapping in definition.get("fieldMappings", []) + definition.get("outputFieldMappings", []):
+        if not mapping.get("sourceFieldName") or not mapping.get("targetFieldName"):
+            errors.append(f"フィールドマッピング {mapping} が不正です")
+    for mapping in definition.get("outputFieldMappings", []):
+        if not mapping.get("sourceFieldName", "").startswith("/document"):
+            errors.append(f"出力フィールドマッピングのソース '{mapping.get('sourceFieldName')}' は /document から始まる必要があります")
+    return errors
+
+DEFINITION_VALIDATORS = {
+    "index": validate_index_definition,
+    "skillset": validate_skillset_definition,
+    "datasource": validate_datasource_definition,
+    "indexer": validate_indexer_definition,
+}
+
+def check_definition(kind, definition, resource_label, resource_name):
+    """送信前に定義を検証し、問題があればログに出力してFalseを返す"""
+    errors = []
+    if not definition.get("name"):
+        errors.append("name が設定されていません")
+    errors.extend(DEFINITION_VALIDATORS[kind](definition))
+    for error in errors:
+        logger.error("⚠️  %s '%s' の定義が不正です: %s", resource_label, resource_name, error)
+    return not errors
+
+def translated_field_name(language_code):
+    """翻訳結果を格納するフィールド名を取得（例: zh-Hans -> translated_text_zh_Hans）"""
+    return f"translated_text_{language_code.replace('-', '_')}"
+
+def make_translation_skill(to_language, from_language=None):
+    """指定した言語への翻訳スキルの定義を作成"""
+    skill = {
+        "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
+        "context": "/document",
+        "defaultToLanguageCode": to_language,
+        "inputs": [
+            {
+                "name": "text",
+                "source": "/document/merged_content"
+            }
+        ],
+        "outputs": [
+            {
+                "name": "translatedText",
+                "targetName": translated_field_name(to_language)
+            }
+        ]
+    }
+    if from_language:
+        skill["defaultFromLanguageCode"] = from_language
+    return skill
+
 def create_arg_parser():
     """コマンドライン引数のパーサーを作成"""
     parser = argparse.ArgumentParser(description="PDFファイルからインデックスを作成")
@@ -42,96 +434,65 @@ def create_arg_parser():
     parser.add_argument("--prefix", default="contents/pdf", help="Blobプレフィックス（PDFファイルの格納場所、デフォルト: contents/pdf）")
     parser.add_argument("--use-skillset", action="store_true", help="Cognitive Servicesのスキルセットを使用する")
     parser.add_argument("--delete-only", action="store_true", help="リソースを削除するだけ")
+    parser.add_argument("--force-recreate", action="store_true", help="既存のリソースを削除してから作成し直す（定義に互換性のない変更がある場合に使用）")
     parser.add_argument("--debug", action="store_true", help="デバッグログを出力")
+    parser.add_argument("--trace", action="store_true", help="Azure へのリクエストごとのステータスとレイテンシをJSON形式で出力")
     parser.add_argument("--vector-search", action="store_true", help="ベクトル検索を有効にする")
-    parser.add_argument("--env-file", default="environment/hackathon20250324.env", help="環境変数ファイルのパス（デフォルト: environment/hackathon20250324.env）")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help=f"インデクサーが1回に処理するドキュメント数（デフォルト: {DEFAULT_BATCH_SIZE}、スキルセット使用時は {DEFAULT_SKILLSET_BATCH_SIZE}）。"
+                             "大きくするとAPI呼び出しが減りスループットが向上しますが、1バッチ16MBの上限を超えると失敗します")
+    parser.add_argument("--max-failed-items", type=int, default=DEFAULT_MAX_FAILED_ITEMS,
+                        help=f"インデクサー実行全体で許容する失敗ドキュメント数（デフォルト: {DEFAULT_MAX_FAILED_ITEMS}）")
+    parser.add_argument("--max-failed-items-per-batch", type=int, default=DEFAULT_MAX_FAILED_ITEMS_PER_BATCH,
+                        help=f"1バッチで許容する失敗ドキュメント数（デフォルト: {DEFAULT_MAX_FAILED_ITEMS_PER_BATCH}）")
+    parser.add_argument("--wait", action="store_true", help="インデクサーの実行完了まで待機する（デフォルトでは実行要求の受理のみ確認）")
+    parser.add_argument("--env-file", default=None,
+                        help="環境変数ファイルのパス（指定したファイルの値を優先。省略時は .env があれば読み込み、設定済みの環境変数は上書きしない）")
     return parser
 
-def delete_search_resources(endpoint, index_name):
-    """検索リソース（インデックス、インデクサー、スキルセット、データソース）を削除"""
-    headers = get_search_headers()
-
-    # インデックスを削除
-    try:
-        response = requests.delete(
-            f"{endpoint}/indexes/{index_name}?api-version={API_VERSION}",
-            headers=headers
-        )
-        if response.status_code == 204 or response.status_code == 404:
-            logger.info(f"🗑️  インデックス '{index_name}' を削除しました")
-        else:
-            logger.warning(f"⚠️  インデックス '{index_name}' の削除に失敗: {response.text}")
-    except Exception as e:
-        logger.error(f"⚠️ インデックス削除エラー: {str(e)}")
-
-    # インデクサーを削除
-    indexer_name = f"{index_name}-indexer"
-    try:
-        response = requests.delete(
-            f"{endpoint}/indexers/{indexer_name}?api-version={API_VERSION}",
-            headers=headers
-        )
-        if response.status_code == 204 or response.status_code == 404:
-            logger.info(f"🗑️  インデクサー '{indexer_name}' を削除しました")
-        else:
-            logger.warning(f"⚠️  インデクサー '{indexer_name}' の削除に失敗: {response.text}")
-    except Exception as e:
-        logger.error(f"⚠️ インデクサー削除エラー: {str(e)}")
-
-    # スキルセットを削除
-    skillset_name = f"{index_name}-skillset"
-    try:
-        response = requests.delete(
-            f"{endpoint}/skillsets/{skillset_name}?api-version={API_VERSION}",
-            headers=headers
-        )
-        if response.status_code == 204 or response.status_code == 404:
-            logger.info(f"🗑️  スキルセット '{skillset_name}' を削除しました")
-        else:
-            logger.warning(f"⚠️  スキルセット '{skillset_name}' の削除に失敗: {response.text}")
-    except Exception as e:
-        logger.error(f"⚠️ スキルセット削除エラー: {str(e)}")
-
-    # データソースを削除
-    datasource_name = f"{index_name}-datasource"
+def delete_search_resource(url, resource_label, resource_name):
+    """検索リソースを1件削除"""
     try:
-        response = requests.delete(
-            f"{endpoint}/datasources/{datasource_name}?api-version={API_VERSION}",
-            headers=headers
-        )
-        if response.status_code == 204 or response.status_code == 404:
-            logger.info(f"🗑️  データソース '{datasource_name}' を削除しました")
-        else:
-            logger.warning(f"⚠️  データソース '{datasource_name}' の削除に失敗: {response.text}")
-    except Exception as e:
-        logger.error(f"⚠️ データソース削除エラー: {str(e)}")
-
-def create_pdf_index(endpoint, index_name, use_vector=False):
-    """PDFファイル用のインデックスを作成"""
-    headers = get_search_headers()
-
-    # PDFファイル用のインデックス定義
-    index_definition = {
-        "name": index_name,
-        "fields": [
-            {"name": "id", "type": "Edm.String", "key": True, "searchable": False},
-            {"name": "content", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False, "facetable": False},
-            {"name": "merged_content", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False, "facetable": False},
-            {"name": "metadata_storage_name", "type": "Edm.String", "searchable": True, "filterable": True, "sortable": True},
-            {"name": "metadata_storage_path", "type": "Edm.String", "searchable": False, "filterable": True, "sortable": True},
-            {"name": "metadata_storage_size", "type": "Edm.Int64", "searchable": False, "filterable": True, "sortable": True},
-            {"name": "metadata_content_type", "type": "Edm.String", "searchable": True, "filterable": True, "sortable": True},
-            {"name": "language", "type": "Edm.String", "searchable": True, "filterable": True, "sortable": True},
-            {"name": "translated_text", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-            {"name": "keyphrases", "type": "Collection(Edm.String)", "searchable": True, "filterable": True, "facetable": True},
-            {"name": "translated_text_ja", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-            {"name": "translated_text_en", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-            {"name": "translated_text_fr", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-            {"name": "translated_text_es", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-            {"name": "translated_text_de", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-            {"name": "translated_text_zh_Hans", "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False},
-        ]
-    }
+        with search_request("DELETE", url, stream=True) as response:
+            if response.status_code == 204 or response.status_code == 404:
+                logger.info("🗑️  %s '%s' を削除しました", resource_label, resource_name)
+                discard_response_body(response)
+                update_resource_state(url, None)
+            else:
+                logger.warning("⚠️  %s '%s' の削除に失敗: %s", resource_label, resource_name, error_text(response))
+    except REQUEST_ERRORS as e:
+        logger.error("⚠️ %s削除エラー: %s", resource_label, e)
+
+def delete_search_resources(urls, index_name):
+    """検索リソース（インデックス、インデクサー、スキルセット、データソース）を削除"""
+    # 削除対象（互いに依存しないため並列に削除する）
+    targets = [
+        (urls.index, "インデックス", index_name),
+        (urls.indexer, "インデクサー", f"{index_name}-indexer"),
+        (urls.skillset, "スキルセット", f"{index_name}-skillset"),
+        (urls.datasource, "データソース", f"{index_name}-datasource"),
+    ]
+
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        futures = [executor.submit(delete_search_resource, url, label, name) for url, label, name in targets]
+
+    # 通信エラー以外の例外（状態ファイルの処理など）は握りつぶさず呼び出し元に伝える
+    for future in futures:
+        future.result()
+
+@lru_cache(maxsize=4)
+def build_pdf_index_payload(index_name, use_vector=False):
+    """PDFファイル用のインデックス定義を検証してJSONバイト列として構築（同じ引数では再構築しない）
+
+    定義が不正な場合は None を返す
+    """
+    # PDFファイル用のインデックス定義（templates/pdf_index.json）に翻訳結果のフィールドを追加
+    index_definition = load_template("pdf_index")
+    index_definition["name"] = index_name
+    index_definition["fields"].extend(
+        {"name": translated_field_name(code), "type": "Edm.String", "searchable": True, "filterable": False, "sortable": False}
+        for code, _ in LANGUAGES
+    )
 
     # ベクトル検索フィールドを追加
     if use_vector:
@@ -181,236 +542,70 @@ def create_pdf_index(endpoint, index_name, use_vector=False):
     #         ]
     #     }
 
-    # インデックスを作成
-    try:
-        response = requests.put(
-            f"{endpoint}/indexes/{index_name}?api-version={API_VERSION}",
-            headers=headers,
-            json=index_definition
-        )
-        if response.status_code == 201 or response.status_code == 200:
-            logger.info(f"✅ インデックス '{index_name}' を作成しました")
-            return True
-        else:
-            logger.error(f"⚠️  インデックス '{index_name}' の作成に失敗: {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"⚠️ インデックス作成エラー: {str(e)}")
+    # シリアライズ前の定義を検証する（結果ごとキャッシュされるため検証も初回のみ）
+    if not check_definition("index", index_definition, "インデックス", index_name):
+        return None
+
+    return json.dumps(index_definition).encode("utf-8")
+
+def create_pdf_index(urls, index_name, use_vector=False):
+    """PDFファイル用のインデックスを作成"""
+    payload = build_pdf_index_payload(index_name, use_vector)
+    if payload is None:
         return False
 
-def create_skillset(endpoint, index_name, cognitive_services_key, cognitive_services_endpoint):
+    # インデックスを作成
+    return put_search_resource(
+        urls.index,
+        payload,
+        "インデックス",
+        index_name
+    )
+
+def create_skillset(urls, index_name, cognitive_services_key, cognitive_services_endpoint):
     """PDF処理用のスキルセットを作成"""
-    headers = get_search_headers()
-
     skillset_name = f"{index_name}-skillset"
 
-    # PDF処理用のスキルセット定義
-    skillset_definition = {
-        "name": skillset_name,
-        "description": "PDF document processing skillset",
-        "skills": [
-            # PDFからテキストを抽出するスキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.SplitSkill",
-                "textSplitMode": "pages",
-                "maximumPageLength": 5000,
-                "defaultLanguageCode": "ja",
-                "context": "/document",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "textItems",
-                        "targetName": "pages"
-                    }
-                ]
-            },
-            # テキストをマージするスキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.MergeSkill",
-                "insertPreTag": " ",
-                "insertPostTag": " ",
-                "context": "/document",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/content"
-                    },
-                    {
-                        "name": "itemsToInsert",
-                        "source": "/document/pages/*"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "mergedText",
-                        "targetName": "merged_content"
-                    }
-                ]
-            },
-            # 言語検出スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.LanguageDetectionSkill",
-                "context": "/document",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "languageCode",
-                        "targetName": "language"
-                    }
-                ]
-            },
-            # キーフレーズ抽出スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.KeyPhraseExtractionSkill",
-                "context": "/document",
-                "defaultLanguageCode": "ja",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    },
-                    {
-                        "name": "languageCode",
-                        "source": "/document/language"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "keyPhrases",
-                        "targetName": "keyphrases"
-                    }
-                ]
-            },
-            # 日本語から英語への翻訳スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
-                "context": "/document",
-                "defaultToLanguageCode": "en",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "translatedText",
-                        "targetName": "translated_text_en"
-                    }
-                ]
-            },
-            # 英語から日本語への翻訳スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
-                "context": "/document",
-                "defaultFromLanguageCode": "en",
-                "defaultToLanguageCode": "ja",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "translatedText",
-                        "targetName": "translated_text_ja"
-                    }
-                ]
-            },
-            # 英語からフランス語への翻訳スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
-                "context": "/document",
-                "defaultFromLanguageCode": "en",
-                "defaultToLanguageCode": "fr",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "translatedText",
-                        "targetName": "translated_text_fr"
-                    }
-                ]
-            },
-            # 英語からスペイン語への翻訳スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
-                "context": "/document",
-                "defaultFromLanguageCode": "en",
-                "defaultToLanguageCode": "es",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "translatedText",
-                        "targetName": "translated_text_es"
-                    }
-                ]
-            },
-            # 英語からドイツ語への翻訳スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
-                "context": "/document",
-                "defaultFromLanguageCode": "en",
-                "defaultToLanguageCode": "de",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "translatedText",
-                        "targetName": "translated_text_de"
-                    }
-                ]
-            },
-            # 英語から中国語簡体字への翻訳スキル
-            {
-                "@odata.type": "#Microsoft.Skills.Text.TranslationSkill",
-                "context": "/document",
-                "defaultFromLanguageCode": "en",
-                "defaultToLanguageCode": "zh-Hans",
-                "inputs": [
-                    {
-                        "name": "text",
-                        "source": "/document/merged_content"
-                    }
-                ],
-                "outputs": [
-                    {
-                        "name": "translatedText",
-                        "targetName": "translated_text_zh_Hans"
-                    }
-                ]
-            }
-        ],
-        "cognitiveServices": {
-            "@odata.type": "#Microsoft.Azure.Search.CognitiveServicesByKey",
-            "description": "Cognitive Services",
-            "key": cognitive_services_key
+    # PDF処理用のスキルセット定義（templates/pdf_skillset.json）
+    # テキスト分割スキルで本文を5,000文字ごとのページに分け、マージスキルでそれらを本文の後ろに連結して merged_content を作る。
+    # 言語検出・キーフレーズ抽出・翻訳はいずれも /document 単位で merged_content に対して1回ずつ実行される
+    skillset_definition = load_template("pdf_skillset")
+    skillset_definition["name"] = skillset_name
+    skillset_definition["cognitiveServices"]["key"] = cognitive_services_key
+
+    # 翻訳スキルを追加
+    # Translator の複数言語指定（/translate?to=en&to=ja&...）をラップしたWeb APIが設定されている場合は、
+    # 言語ごとの翻訳スキルの代わりに、1回の呼び出しで全言語を翻訳するカスタムスキルを使用する
+    batch_translation_uri = os.environ.get("AZURE_TRANSLATOR_BATCH_SKILL_URI", "")
+    if batch_translation_uri:
+        batch_translation_skill = {
+            "@odata.type": "#Microsoft.Skills.Custom.WebApiSkill",
+            "name": "batch-translation-skill",
+            "description": "Translate text into all target languages with a single Translator request",
+            "uri": batch_translation_uri,
+            "httpMethod": "POST",
+            "timeout": "PT2M",
+            "context": "/document",
+            "inputs": [
+                {
+                    "name": "text",
+                    "source": "/document/merged_content"
+                }
+            ],
+            "outputs": [
+                {"name": translated_field_name(code), "targetName": translated_field_name(code)}
+                for code, _ in LANGUAGES
+            ],
+            "httpHeaders": {}
         }
-    }
+
+        skillset_definition["skills"].append(batch_translation_skill)
+        logger.info("一括翻訳スキルを使用します: %s", batch_translation_uri)
+    else:
+        # 言語ごとの翻訳スキルを追加
+        skillset_definition["skills"].extend(
+            make_translation_skill(to_language, from_language) for to_language, from_language in LANGUAGES
+        )
 
     # ベクトル埋め込みを生成するカスタムスキル
     # 注：現在のAPIバージョンでの互換性の問題のため、一時的に無効化
@@ -470,119 +665,63 @@ def create_skillset(endpoint, index_name, cognitive_services_key, cognitive_serv
     #         "_openai_deployment": embedding_deployment
     #     }
 
-    # スキルセットを作成
-    try:
-        response = requests.put(
-            f"{endpoint}/skillsets/{skillset_name}?api-version={API_VERSION}",
-            headers=headers,
-            json=skillset_definition
-        )
-        if response.status_code == 201 or response.status_code == 200:
-            logger.info(f"✅ スキルセット '{skillset_name}' を作成しました")
-            return True
-        else:
-            logger.error(f"⚠️  スキルセット '{skillset_name}' の作成に失敗: {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"⚠️ スキルセット作成エラー: {str(e)}")
+    if not check_definition("skillset", skillset_definition, "スキルセット", skillset_name):
         return False
 
-def create_datasource(endpoint, index_name, container_name, connection_string, prefix):
+    # スキルセットを作成
+    return put_search_resource(
+        urls.skillset,
+        json.dumps(skillset_definition).encode("utf-8"),
+        "スキルセット",
+        skillset_name
+    )
+
+def create_datasource(urls, index_name, container_name, connection_string, prefix):
     """Blobデータソースを作成"""
-    headers = get_search_headers()
-
     datasource_name = f"{index_name}-datasource"
 
     # 特定のプレフィックスのPDFファイルのみを対象とする
     query = prefix  # f"{prefix}/*.pdf" から変更
 
-    # データソース定義
-    datasource_definition = {
-        "name": datasource_name,
-        "description": "PDF documents in Azure Blob Storage",
-        "type": "azureblob",
-        "credentials": {
-            "connectionString": connection_string
-        },
-        "container": {
-            "name": container_name,
-            "query": query
-        },
-        "dataDeletionDetectionPolicy": {
-            "@odata.type": "#Microsoft.Azure.Search.SoftDeleteColumnDeletionDetectionPolicy",
-            "softDeleteColumnName": "isDeleted",
-            "softDeleteMarkerValue": "true"
-        }
-    }
+    # データソース定義（templates/pdf_datasource.json）
+    datasource_definition = load_template("pdf_datasource")
+    datasource_definition["name"] = datasource_name
+    datasource_definition["credentials"]["connectionString"] = connection_string
+    datasource_definition["container"]["name"] = container_name
+    datasource_definition["container"]["query"] = query
 
-    # データソースを作成
-    try:
-        response = requests.put(
-            f"{endpoint}/datasources/{datasource_name}?api-version={API_VERSION}",
-            headers=headers,
-            json=datasource_definition
-        )
-        if response.status_code == 201 or response.status_code == 200:
-            logger.info(f"✅ データソース '{datasource_name}' を作成しました")
-            return True
-        else:
-            logger.error(f"⚠️  データソース '{datasource_name}' の作成に失敗: {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"⚠️ データソース作成エラー: {str(e)}")
+    if not check_definition("datasource", datasource_definition, "データソース", datasource_name):
         return False
 
-def create_indexer(endpoint, index_name, use_skillset):
+    # データソースを作成
+    return put_search_resource(
+        urls.datasource,
+        json.dumps(datasource_definition).encode("utf-8"),
+        "データソース",
+        datasource_name
+    )
+
+def create_indexer(urls, index_name, use_skillset, batch_size=None,
+                   max_failed_items=DEFAULT_MAX_FAILED_ITEMS, max_failed_items_per_batch=DEFAULT_MAX_FAILED_ITEMS_PER_BATCH):
     """PDFインデクサーを作成"""
-    headers = get_search_headers()
+    # バッチサイズが指定されていない場合は、スキルセットの有無に応じて決定
+    if batch_size is None:
+        batch_size = DEFAULT_SKILLSET_BATCH_SIZE if use_skillset else DEFAULT_BATCH_SIZE
 
     indexer_name = f"{index_name}-indexer"
     datasource_name = f"{index_name}-datasource"
     skillset_name = f"{index_name}-skillset"
 
-    # インデクサー定義
-    indexer_definition = {
-        "name": indexer_name,
-        "description": "PDF document indexer",
-        "dataSourceName": datasource_name,
-        "targetIndexName": index_name,
-        "parameters": {
-            "configuration": {
-                "dataToExtract": "contentAndMetadata",
-                "parsingMode": "default",
-                "indexStorageMetadataOnlyForOversizedDocuments": True,
-                "indexedFileNameExtensions": ".pdf",
-                "failOnUnsupportedContentType": False,
-                "failOnUnprocessableDocument": False
-            }
-        },
-        "fieldMappings": [
-            {
-                "sourceFieldName": "metadata_storage_path",
-                "targetFieldName": "id",
-                "mappingFunction": {
-                    "name": "base64Encode"
-                }
-            },
-            {
-                "sourceFieldName": "metadata_storage_path",
-                "targetFieldName": "metadata_storage_path"
-            },
-            {
-                "sourceFieldName": "metadata_storage_name",
-                "targetFieldName": "metadata_storage_name"
-            },
-            {
-                "sourceFieldName": "metadata_storage_size",
-                "targetFieldName": "metadata_storage_size"
-            },
-            {
-                "sourceFieldName": "metadata_content_type",
-                "targetFieldName": "metadata_content_type"
-            }
-        ],
-        "outputFieldMappings": []
-    }
+    # インデクサー定義（templates/pdf_indexer.json）
+    indexer_definition = load_template("pdf_indexer")
+    indexer_definition["name"] = indexer_name
+    indexer_definition["dataSourceName"] = datasource_name
+    indexer_definition["targetIndexName"] = index_name
+    indexer_definition["parameters"].update({
+        "batchSize": batch_size,
+        "maxFailedItems": max_failed_items,
+        "maxFailedItemsPerBatch": max_failed_items_per_batch
+    })
 
     # スキルセットが有効な場合はマッピングを追加
     if use_skillset:
@@ -603,31 +742,13 @@ def create_indexer(endpoint, index_name, use_skillset):
             {
                 "sourceFieldName": "/document/keyphrases",
                 "targetFieldName": "keyphrases"
-            },
-            {
-                "sourceFieldName": "/document/translated_text_ja",
-                "targetFieldName": "translated_text_ja"
-            },
-            {
-                "sourceFieldName": "/document/translated_text_en",
-                "targetFieldName": "translated_text_en"
-            },
-            {
-                "sourceFieldName": "/document/translated_text_fr",
-                "targetFieldName": "translated_text_fr"
-            },
-            {
-                "sourceFieldName": "/document/translated_text_es",
-                "targetFieldName": "translated_text_es"
-            },
-            {
-                "sourceFieldName": "/document/translated_text_de",
-                "targetFieldName": "translated_text_de"
-            },
+            }
+        ] + [
             {
-                "sourceFieldName": "/document/translated_text_zh_Hans",
-                "targetFieldName": "translated_text_zh_Hans"
+                "sourceFieldName": f"/document/{translated_field_name(code)}",
+                "targetFieldName": translated_field_name(code)
             }
+            for code, _ in LANGUAGES
         ]
         
         # ベクトル埋め込みマッピングも追加（スキルセットに含まれている場合）
@@ -638,43 +759,87 @@ def create_indexer(endpoint, index_name, use_skillset):
         # }
         # indexer_definition["outputFieldMappings"].append(vector_mapping)
 
-    # インデクサーを作成
-    try:
-        response = requests.put(
-            f"{endpoint}/indexers/{indexer_name}?api-version={API_VERSION}",
-            headers=headers,
-            json=indexer_definition
-        )
-        if response.status_code == 201 or response.status_code == 200:
-            logger.info(f"✅ インデクサー '{indexer_name}' を作成しました")
-            return True
-        else:
-            logger.error(f"⚠️  インデクサー '{indexer_name}' の作成に失敗: {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"⚠️ インデクサー作成エラー: {str(e)}")
+    if not check_definition("indexer", indexer_definition, "インデクサー", indexer_name):
         return False
 
-def run_indexer(endpoint, index_name):
+    # インデクサーを作成
+    return put_search_resource(
+        urls.indexer,
+        json.dumps(indexer_definition).encode("utf-8"),
+        "インデクサー",
+        indexer_name
+    )
+
+def run_indexer(urls, index_name):
     """PDFインデクサーを実行"""
-    headers = get_search_headers()
     indexer_name = f"{index_name}-indexer"
 
     try:
-        response = requests.post(
-            f"{endpoint}/indexers/{indexer_name}/run?api-version={API_VERSION}",
-            headers=headers
-        )
-        if response.status_code == 202:
-            logger.info(f"✅ インデクサー '{indexer_name}' を実行しました")
-            return True
-        else:
-            logger.error(f"⚠️  インデクサー '{indexer_name}' の実行に失敗: {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"⚠️ インデクサー実行エラー: {str(e)}")
+        with search_request("POST", urls.indexer_run, stream=True) as response:
+            if response.status_code == 202:
+                logger.info("✅ インデクサー '%s' を実行しました", indexer_name)
+                discard_response_body(response)
+                return True
+            else:
+                logger.error("⚠️  インデクサー '%s' の実行に失敗: %s", indexer_name, error_text(response))
+                return False
+    except REQUEST_ERRORS as e:
+        logger.error("⚠️ インデクサー実行エラー: %s", e)
         return False
 
+def parse_indexer_time(value):
+    """インデクサーの実行結果の時刻（ISO 8601、UTC）を datetime に変換"""
+    if not value:
+        return None
+    # fromisoformat は小数秒6桁までのため、7桁で返される場合に切り詰める
+    value = FRACTIONAL_SECONDS_PATTERN.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), value.replace("Z", "+00:00"))
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def wait_for_indexer(urls, index_name, started_at, timeout=1800, initial_interval=2.0, max_interval=60.0):
+    """インデクサーの実行状況を指数バックオフでポーリングし、完了まで待機
+
+    実行要求の直後は lastResult に前回の実行結果が残っているため、
+    started_at（実行要求の直前の時刻）より前に開始された結果は無視する
+    """
+    indexer_name = f"{index_name}-indexer"
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+
+    while time.monotonic() < deadline:
+        try:
+            response = search_request("GET", urls.indexer_status)
+            if response.status_code != 200:
+                logger.error("⚠️  インデクサー '%s' の状態取得に失敗: %s", indexer_name, error_text(response))
+                return False
+
+            last_result = response.json().get("lastResult") or {}
+            status = last_result.get("status")
+            start_time = parse_indexer_time(last_result.get("startTime"))
+            if start_time is None or start_time < started_at - INDEXER_CLOCK_SKEW:
+                # 今回の実行がまだ開始されていない（前回の実行結果が表示されている）
+                logger.debug("インデクサー '%s' の実行開始を待機しています（%.1f秒後に再確認）", indexer_name, interval)
+            elif status == "success":
+                logger.info("✅ インデクサー '%s' の実行が完了しました（処理: %s件、失敗: %s件）", indexer_name, last_result.get('itemsProcessed', 0), last_result.get('itemsFailed', 0))
+                return True
+            elif status in ("transientFailure", "persistentFailure"):
+                logger.error("⚠️  インデクサー '%s' の実行に失敗: %s", indexer_name, last_result.get('errorMessage'))
+                return False
+            else:
+                logger.debug("インデクサー '%s' の状態: %s（%.1f秒後に再確認）", indexer_name, status, interval)
+        except REQUEST_ERRORS as e:
+            logger.error("⚠️ インデクサー状態取得エラー: %s", e)
+            return False
+
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * 2, max_interval)
+
+    logger.error("⚠️  インデクサー '%s' の実行が %s 秒以内に完了しませんでした", indexer_name, timeout)
+    return False
+
 def main():
     """メイン関数"""
     # コマンドライン引数の解析
@@ -686,71 +851,98 @@ def main():
         logger.setLevel(logging.DEBUG)
         logger.debug("デバッグモードが有効です")
 
-    # コマンドライン引数で指定された環境変数ファイルを読み込む
+    # 構造化トレースが有効な場合はJSONハンドラーを追加
+    if args.trace:
+        enable_trace()
+
+    # コマンドライン引数で指定された環境変数ファイルを一度だけ読み込む（明示的に指定されたファイルの値を優先）
     if args.env_file:
-        logger.info(f"環境変数ファイル '{args.env_file}' を読み込みます")
-        load_dotenv(args.env_file)
+        if not os.path.exists(args.env_file):
+            logger.error("⚠️ 環境変数ファイル '%s' が見つかりません", args.env_file)
+            return False
+        logger.info("環境変数ファイル '%s' を読み込みます", args.env_file)
+        load_dotenv(args.env_file, override=True)
+    else:
+        # 指定がない場合は .env があれば補助的に読み込む（設定済みの環境変数は上書きしない）
+        load_dotenv()
+
+    if args.batch_size is not None and args.batch_size < 1:
+        logger.error("⚠️ --batch-size には1以上の値を指定してください")
+        return False
 
     # Azure AI Search エンドポイントを取得
-    search_endpoint = os.environ.get("AZURE_SEARCH_ENDPOINT")
+    search_endpoint = get_search_endpoint()
     if not search_endpoint:
         logger.error("⚠️ 環境変数 'AZURE_SEARCH_ENDPOINT' が設定されていません")
         return False
 
-    # インデックス名を取得
+    # 検索APIのヘッダーは共有セッションに一度だけ設定する
+    SESSION.headers.update(get_search_headers())
+
+    # インデックス名を取得し、各リソースのURLを構築
     index_name = args.index_name
+    urls = build_resource_urls(search_endpoint, index_name)
 
-    # 既存のリソースを削除
-    delete_search_resources(search_endpoint, index_name)
+    # 削除・作成の並列リクエストの前に接続を確立しておく
+    warm_up_connection(search_endpoint)
+
+    # 既存のリソースを削除（指定された場合のみ。通常は定義の変更があったリソースだけを更新する）
+    if args.force_recreate or args.delete_only:
+        delete_search_resources(urls, index_name)
 
     # 削除のみのモードの場合はここで終了
     if args.delete_only:
         logger.info("✅ リソースの削除が完了しました")
         return True
 
-    # PDFインデックスを作成
-    if not create_pdf_index(search_endpoint, index_name, args.vector_search):
-        logger.error("⚠️ インデックスの作成に失敗しました")
+    # Cognitive Services の接続情報を取得（スキルセットを使用する場合）
+    # AIServices.S0タイプではなく、all-in-oneタイプのキーが必要
+    cognitive_services_key = os.environ.get("AZURE_COGNITIVE_ALLINONE_KEY")
+    cognitive_services_endpoint = os.environ.get("AZURE_COGNITIVE_ALLINONE_ENDPOINT")
+    if args.use_skillset and (not cognitive_services_key or not cognitive_services_endpoint):
+        logger.error("⚠️ Cognitive Services の接続情報が設定されていません")
         return False
 
-    # スキルセットを使用する場合
-    if args.use_skillset:
-        # Cognitive Services の接続情報を取得
-        # AIServices.S0タイプではなく、all-in-oneタイプのキーが必要
-        cognitive_services_key = os.environ.get("AZURE_COGNITIVE_ALLINONE_KEY")
-        cognitive_services_endpoint = os.environ.get("AZURE_COGNITIVE_ALLINONE_ENDPOINT")
-
-        if not cognitive_services_key or not cognitive_services_endpoint:
-            logger.error("⚠️ Cognitive Services の接続情報が設定されていません")
-            return False
-
-        # スキルセットを作成
-        if not create_skillset(search_endpoint, index_name, cognitive_services_key, cognitive_services_endpoint):
-            logger.error("⚠️ スキルセットの作成に失敗しました")
-            return False
-
     # Blobストレージの接続情報を取得
     storage_connection_string = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
     if not storage_connection_string:
         logger.error("⚠️ 環境変数 'AZURE_STORAGE_CONNECTION_STRING' が設定されていません")
         return False
 
-    # データソースを作成
-    if not create_datasource(search_endpoint, index_name, args.container, storage_connection_string, args.prefix):
-        logger.error("⚠️ データソースの作成に失敗しました")
+    # インデックス・スキルセット・データソースは互いに依存しないため並列に作成する
+    # （インデクサーのみが3つすべてに依存する）
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = {
+            executor.submit(create_pdf_index, urls, index_name, args.vector_search): "インデックス",
+            executor.submit(create_datasource, urls, index_name, args.container, storage_connection_string, args.prefix): "データソース",
+        }
+        if args.use_skillset:
+            futures[executor.submit(create_skillset, urls, index_name, cognitive_services_key, cognitive_services_endpoint)] = "スキルセット"
+        wait(futures)
+
+    failed = [label for future, label in futures.items() if not future.result()]
+    if failed:
+        for label in failed:
+            logger.error("⚠️ %sの作成に失敗しました", label)
         return False
 
     # インデクサーを作成
-    if not create_indexer(search_endpoint, index_name, args.use_skillset):
+    if not create_indexer(urls, index_name, args.use_skillset, args.batch_size,
+                          args.max_failed_items, args.max_failed_items_per_batch):
         logger.error("⚠️ インデクサーの作成に失敗しました")
         return False
 
-    # インデクサーを実行
-    if not run_indexer(search_endpoint, index_name):
+    # インデクサーを実行（完了待ちで前回の実行結果と区別するため、実行要求の直前の時刻を記録する）
+    run_started_at = datetime.now(timezone.utc)
+    if not run_indexer(urls, index_name):
         logger.error("⚠️ インデクサーの実行に失敗しました")
         return False
 
-    logger.info(f"✅ インデックス '{index_name}' の作成が完了しました")
+    # インデクサーの実行完了を待機する場合
+    if args.wait and not wait_for_indexer(urls, index_name, run_started_at):
+        return False
+
+    logger.info("✅ インデックス '%s' の作成が完了しました", index_name)
     logger.info("🔍 インデックスの作成状況は Azure Portal で確認できます")
     return True
 
@@ -38,6 +38,8 @@ RAGは大規模言語モデル（LLM）の応答生成能力と外部知識検
 - AZURE_OPENAI_ENDPOINT: Azure OpenAI Serviceのエンドポイント
 - AZURE_OPENAI_API_KEY: OpenAIのAPIキー
 - AZURE_OPENAI_CHAT_DEPLOYMENT: デプロイされたモデル名
+- AZURE_OPENAI_CHAT_CONTEXT_TOKENS: モデルのコンテキスト長（省略可、既定値は128000）
+- AZURE_OPENAI_EMBEDDING_DEPLOYMENT: 埋め込みモデルのデプロイ名（省略可、設定するとベクトルフィールドを持つインデックスでハイブリッド検索を行う）
 
 使用例:
 =====
@@ -68,21 +70,80 @@ import os
 import sys
 import json
 import argparse
-import subprocess
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Tuple, Union, TYPE_CHECKING
+from functools import lru_cache
 from dotenv import load_dotenv
 import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
-# Azure SDK
-from azure.identity import AzureCliCredential, DefaultAzureCredential
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
-from azure.search.documents.indexes.models import SearchIndex
+# Azure SDK・openai・requestsは読み込みに時間がかかるため、使用する関数の中で読み込む
+# （--help や引数の誤りではSDKを一切読み込まずに終了できる）
+if TYPE_CHECKING:
+    # 型注釈でのみ使用（実行時には読み込まない）
+    from azure.search.documents import SearchClient
+    from azure.search.documents.indexes import SearchIndexClient
+
+# Azure AI Search をトークン認証（Azure CLI）で利用する際のスコープ
+SEARCH_TOKEN_SCOPE = "https://search.azure.com/.default"
+
+# Azure OpenAI APIのバージョン
+OPENAI_API_VERSION = "2024-02-15-preview"
+
+# インデックスのスキーマ情報のキャッシュ（スキーマはめったに変わらないため、起動のたびに取得しない）
+SCHEMA_CACHE_DIR = Path.home() / ".cache" / "flexible_rag" / "schema"
+SCHEMA_CACHE_TTL = 3600
+# スキーマ情報の形式を変更したら上げる（古い形式のキャッシュファイルを読まないようにする）
+SCHEMA_CACHE_VERSION = 4
+SCHEMA_CACHE = {}
+# 対話モードでインデックスの選択を待つ間に先行取得するスキーマの数（一覧の先頭から）
+SCHEMA_PREFETCH_LIMIT = 3
+
+# スキーマ情報に含めるフィールド属性と、SDKのフィールドオブジェクト上の属性名の候補
+FIELD_ATTRS = [
+    ("searchable", ("searchable", "is_searchable")),
+    ("retrievable", ("retrievable", "is_retrievable")),
+    ("filterable", ("filterable", "is_filterable")),
+    ("sortable", ("sortable", "is_sortable")),
+    ("facetable", ("facetable", "is_facetable")),
+    ("key", ("key", "is_key")),
+]
+
+# ベクトルフィールドを識別する既定のパターン（フィールド名・型）
+DEFAULT_VECTOR_EXCLUDE_PATTERN = "vector"
+DEFAULT_VECTOR_TYPE_PATTERN = "Collection(Edm.Single)"
+
+# リストや辞書のフィールド値をJSON文字列に変換するエンコーダー
+# json.dumps(value, ensure_ascii=False) は呼び出しのたびにエンコーダーを作り直すため、1つを使い回す
+JSON_TEXT_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+# チャットモデルのコンテキスト長（トークン数）と、システムプロンプト・質問などに確保するトークン数
+# コンテキスト長は環境変数 AZURE_OPENAI_CHAT_CONTEXT_TOKENS で上書きできる
+DEFAULT_MODEL_CONTEXT_TOKENS = 128000
+PROMPT_OVERHEAD_TOKENS = 512
+
+# 生成した回答のキャッシュ（同じ質問と検索結果の組み合わせではOpenAIを呼び出さない）
+ANSWER_CACHE_DIR = Path.home() / ".cache" / "flexible_rag" / "answers"
+ANSWER_CACHE_TTL = 86400
+
+# 回答生成のシステムプロンプト
+# 質問や検索結果を含まない固定の文面にして、すべてのリクエストで同一の先頭部分にする
+# （OpenAIのプロンプトキャッシュが効き、入力トークンの課金と最初のトークンまでの時間が減る）
+# このプロンプト設計は以下のポイントを重視:
+# 1. 明確な役割定義: アシスタントの役割と応答範囲を明示
+# 2. 緩やかな制約: 直接関連する情報がなくても関連推測を許可
+# 3. クオリティ指示: 簡潔さと正確性を強調
+ANSWER_SYSTEM_MESSAGE = """
+あなたは知識豊富なアシスタントです。
+次のメッセージで提供される情報源を参考にして、ユーザーの質問に対して有益な回答を提供してください。
+情報源に直接関連する内容が見つからない場合でも、情報源から推測できる関連情報があれば提供してください。
+完全に情報がない場合のみ「情報が見つかりませんでした」と伝えてください。
+回答は日本語で提供し、簡潔かつ正確であることを心がけてください。
+"""
 
 # 環境変数の読み込み
-def load_environment_variables(env_path: str):
+def load_environment_variables(env_path: str, auth_method: str = "auto"):
     """
     指定されたパスから環境変数を読み込む
     
@@ -91,6 +152,7 @@ def load_environment_variables(env_path: str):
     
     Parameters:
         env_path (str): 環境変数ファイル(.env)のパス
+        auth_method (str): 認証方法（"cli" の場合は管理キーを必須としない）
         
     Returns:
         bool: 環境変数の読み込みに成功した場合はTrue、失敗した場合はFalse
@@ -109,11 +171,13 @@ def load_environment_variables(env_path: str):
     # 必須環境変数の確認
     required_vars = [
         "AZURE_SEARCH_ENDPOINT",
-        "AZURE_SEARCH_ADMIN_KEY",
         "AZURE_OPENAI_ENDPOINT",
         "AZURE_OPENAI_API_KEY",
         "AZURE_OPENAI_CHAT_DEPLOYMENT"
     ]
+    # Azure CLIの認証情報で検索サービスにアクセスする場合は管理キーは不要
+    if auth_method != "cli":
+        required_vars.insert(1, "AZURE_SEARCH_ADMIN_KEY")
     
     missing_vars = [var for var in required_vars if not os.environ.get(var)]
     if missing_vars:
@@ -123,42 +187,157 @@ def load_environment_variables(env_path: str):
     return True
 
 # Azure認証情報の取得
-def get_azure_credentials():
+@lru_cache(maxsize=None)
+def get_azure_credentials(auth_method: str = "auto"):
     """
     Azure認証情報を取得する
     
     Azure APIにアクセスするための認証情報を取得します。
-    まずAzure CLIの認証情報を試し、失敗した場合は環境変数から取得したAPIキーを使用します。
+    環境変数に管理キー（AZURE_SEARCH_ADMIN_KEY）が設定されていればそのキーを使用し、
+    設定されていない場合のみAzure CLIの認証情報を試します。
+    Azure CLIの認証確認は az コマンドの呼び出しを伴い数百ミリ秒以上かかるため、
+    キーがある一般的なケースでは省略します。取得した認証情報はプロセス内で使い回します。
     
     Azure認証には主に2つの方法があります:
     1. AzureCliCredential: Azureコマンドラインツールのログイン情報を使用（開発環境向け）
+       検索サービスでロールベースのアクセス制御（RBAC）が有効で、ログインユーザーに
+       検索インデックスのデータ閲覧者などのロールが割り当てられている必要があります
     2. AzureKeyCredential: APIキーを直接使用する方法（本番環境向け）
     
     Reference:
     - Azure Authentication Library: https://learn.microsoft.com/ja-jp/python/api/overview/azure/identity-readme
     
+    Parameters:
+        auth_method (str): 認証方法。"auto"（キーを優先）、"key"（キーのみ）、"cli"（Azure CLIのみ）
+    
     Returns:
         AzureCliCredential または AzureKeyCredential: 認証に成功した場合は認証オブジェクト
-        None: 両方の認証方法が失敗した場合
+        None: 認証方法がすべて失敗した場合
     """
+    from azure.core.credentials import AzureKeyCredential
+    from azure.identity import AzureCliCredential
+    
+    admin_key = os.environ.get("AZURE_SEARCH_ADMIN_KEY")
+    
+    # 環境変数から取得した管理キーを使用
+    if auth_method in ("auto", "key"):
+        if admin_key:
+            return AzureKeyCredential(admin_key)
+        if auth_method == "key":
+            print("エラー: AZURE_SEARCH_ADMIN_KEY が設定されていません。")
+            return None
+    
     try:
         # Azure CLI認証
         credential = AzureCliCredential()
-        # 認証情報をテスト
-        token = credential.get_token("https://management.azure.com/.default")
+        # 認証情報をテスト（Azure AI Search 用のトークンを取得できるか）
+        credential.get_token(SEARCH_TOKEN_SCOPE)
         return credential
     except Exception as e:
         print(f"Azure CLI認証に失敗しました: {str(e)}")
-        print("代替認証方法を試行中...")
+        print("Azure CLIで'az login'を実行してログインしてください。")
+        return None
+
+@lru_cache(maxsize=1)
+def get_search_transport():
+    """
+    Azure AI Search のクライアントで共有するトランスポートを取得する（初回のみ作成）
+    
+    keep-alive / コネクションプールを持つセッションを使い回すため、
+    対話モードで検索を繰り返しても、TLSハンドシェイクは最初の1回だけで済みます。
+    再試行はSDKのRetryPolicyに任せ、アダプター側では再試行しません（二重に再試行しないため）。
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from azure.core.pipeline.transport import RequestsTransport
+    
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=0
+    ))
+    return RequestsTransport(session=session, session_owner=False)
+
+@lru_cache(maxsize=None)
+def get_index_client(search_endpoint: str, credential) -> "SearchIndexClient":
+    """
+    SearchIndexClientを取得する（エンドポイントと認証情報ごとに1度だけ作成）
+    
+    Parameters:
+        search_endpoint (str): Azure AI Searchのエンドポイント
+        credential: Azure認証情報
         
-        try:
-            # 環境変数から取得した認証情報を使用
-            credential = AzureKeyCredential(os.environ["AZURE_SEARCH_ADMIN_KEY"])
-            return credential
-        except Exception as e2:
-            print(f"代替認証にも失敗しました: {str(e2)}")
-            print("Azure CLIで'az login'を実行してログインしてください。")
-            return None
+    Returns:
+        SearchIndexClient: 共有トランスポートを使用するクライアント
+    """
+    from azure.search.documents.indexes import SearchIndexClient
+    
+    return SearchIndexClient(
+        endpoint=search_endpoint,
+        credential=credential,
+        transport=get_search_transport()
+    )
+
+@lru_cache(maxsize=None)
+def get_search_client(search_endpoint: str, index_name: str, credential) -> "SearchClient":
+    """
+    SearchClientを取得する（エンドポイント・インデックス・認証情報ごとに1度だけ作成）
+    
+    Parameters:
+        search_endpoint (str): Azure AI Searchのエンドポイント
+        index_name (str): 検索対象のインデックス名
+        credential: Azure認証情報
+        
+    Returns:
+        SearchClient: 共有トランスポートを使用するクライアント
+    """
+    from azure.search.documents import SearchClient
+    
+    return SearchClient(
+        endpoint=search_endpoint,
+        index_name=index_name,
+        credential=credential,
+        transport=get_search_transport()
+    )
+
+@lru_cache(maxsize=1)
+def get_openai_client():
+    """
+    AzureOpenAIクライアントを取得する（初回のみ作成）
+    
+    Returns:
+        AzureOpenAI: 環境変数の接続情報で作成したクライアント
+    """
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_key=os.environ["AZURE_OPENAI_API_KEY"],
+        api_version=OPENAI_API_VERSION,
+        azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"]
+    )
+
+@lru_cache(maxsize=1)
+def get_embedding_client():
+    """
+    埋め込み用のAzureOpenAIクライアントを取得する（初回のみ作成）
+    
+    setup_env_unified.py で外部の埋め込みモデルを設定した場合（EMBEDDING_API_BASE・EMBEDDING_API_KEY）は
+    そのエンドポイント用のクライアントを作成し、それ以外はチャット用のクライアントを共用します。
+    
+    Returns:
+        AzureOpenAI: 埋め込みモデルのデプロイがあるエンドポイントのクライアント
+    """
+    api_base = os.environ.get("EMBEDDING_API_BASE")
+    api_key = os.environ.get("EMBEDDING_API_KEY")
+    if not api_base or not api_key:
+        return get_openai_client()
+    
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_key=api_key,
+        api_version=os.environ.get("EMBEDDING_API_VERSION") or OPENAI_API_VERSION,
+        azure_endpoint=api_base
+    )
 
 # インデックス一覧の取得
 def list_search_indexes(credential) -> List[str]:
@@ -187,18 +366,8 @@ def list_search_indexes(credential) -> List[str]:
     try:
         search_endpoint = os.environ["AZURE_SEARCH_ENDPOINT"]
         
-        # SearchIndexClientの作成
-        if isinstance(credential, AzureKeyCredential):
-            index_client = SearchIndexClient(
-                endpoint=search_endpoint,
-                credential=credential
-            )
-        else:
-            # API Keyを使用
-            index_client = SearchIndexClient(
-                endpoint=search_endpoint,
-                credential=AzureKeyCredential(os.environ["AZURE_SEARCH_ADMIN_KEY"])
-            )
+        # SearchIndexClientの取得（作成済みのものを再利用）
+        index_client = get_index_client(search_endpoint, credential)
         
         # インデックス一覧の取得
         result = list(index_client.list_indexes())
@@ -207,8 +376,133 @@ def list_search_indexes(credential) -> List[str]:
         print(f"インデックス一覧の取得に失敗しました: {str(e)}")
         return []
 
+def get_embedding_deployment() -> Optional[str]:
+    """埋め込みモデルのデプロイ名を取得する（未設定、またはsetup_env_unified.pyが見つけられなかった場合はNone）"""
+    deployment = os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+    if not deployment or deployment in ("NOT_FOUND", "ERROR"):
+        return None
+    return deployment
+
+@lru_cache(maxsize=128)
+def get_query_embedding(query: str, deployment: str) -> List[float]:
+    """
+    検索クエリの埋め込みベクトルを取得する（同じクエリは再計算しない）
+    
+    Parameters:
+        query (str): 検索クエリ
+        deployment (str): 埋め込みモデルのデプロイ名
+        
+    Returns:
+        List[float]: 埋め込みベクトル
+    """
+    response = get_embedding_client().embeddings.create(model=deployment, input=[query])
+    return response.data[0].embedding
+
+def build_vector_queries(query: str, schema: Dict, top: int) -> Optional[List]:
+    """
+    ハイブリッド検索用のベクトルクエリを作成する
+    
+    インデックスにベクトルフィールドがあり、埋め込みモデルのデプロイが設定されている場合のみ作成します。
+    埋め込みの次元数が一致するベクトルフィールドだけを対象にします。
+    
+    Returns:
+        Optional[List]: VectorizedQueryのリスト。ベクトル検索を行わない場合はNone
+    """
+    deployment = get_embedding_deployment()
+    if not schema["has_vector_fields"] or not deployment:
+        return None
+    
+    try:
+        query_vector = get_query_embedding(query, deployment)
+    except Exception as e:
+        print(f"警告: クエリの埋め込みベクトルを取得できませんでした。テキスト検索のみ行います: {str(e)}")
+        return None
+    
+    vector_fields = [
+        field["name"] for field in schema["fields"]
+        if field.get("vector_search_dimensions") == len(query_vector)
+    ]
+    if not vector_fields:
+        print(f"警告: 次元数 {len(query_vector)} のベクトルフィールドが見つかりません。テキスト検索のみ行います。")
+        return None
+    
+    print(f"ベクトル検索フィールド: {', '.join(vector_fields)}")
+    from azure.search.documents.models import VectorizedQuery
+    return [VectorizedQuery(vector=query_vector, k_nearest_neighbors=top, fields=",".join(vector_fields))]
+
+def get_query_fields(schema: Dict, vector_exclude_pattern: str, vector_type_pattern: str) -> Tuple[List[str], List[str]]:
+    """
+    ベクトルフィールドを除いた検索対象フィールドと取得フィールドを求める
+    
+    Returns:
+        Tuple[List[str], List[str]]: (検索可能なフィールド, 取得するフィールド)
+    """
+    # パターンの小文字化はフィールドごとではなく1回だけ行う
+    vector_exclude_pattern = vector_exclude_pattern.lower()
+    retrievable = set(schema["retrievable_fields"])
+    searchable_fields = []
+    select_fields = []
+    for field in schema["fields"]:
+        name = field["name"]
+        # ベクトル次元を持つフィールドは、名前や型がパターンに一致しなくてもテキスト検索の対象にできない
+        if ("vector_search_dimensions" in field or vector_exclude_pattern in name.lower()
+                or field["type"].startswith(vector_type_pattern)):
+            continue
+        if field["searchable"]:
+            searchable_fields.append(name)
+        if name in retrievable:
+            select_fields.append(name)
+    return searchable_fields, select_fields
+
+def get_schema_cache_path(search_endpoint: str, index_name: str) -> Path:
+    """スキーマキャッシュのファイルパスを取得（検索サービスごとにディレクトリを分ける）"""
+    endpoint_hash = hashlib.blake2b(search_endpoint.encode(), digest_size=8).hexdigest()
+    return SCHEMA_CACHE_DIR / f"v{SCHEMA_CACHE_VERSION}" / endpoint_hash / f"{index_name}.json"
+
+def load_cached_schema(search_endpoint: str, index_name: str, cache_ttl: int) -> Optional[Dict]:
+    """
+    キャッシュ済みのスキーマ情報を読み込む
+    
+    プロセス内のキャッシュを優先し、なければ有効期限内のキャッシュファイルを読み込みます。
+    
+    Returns:
+        Optional[Dict]: スキーマ情報。キャッシュがない、または期限切れの場合はNone
+    """
+    if cache_ttl <= 0:
+        return None
+    
+    cache_key = (search_endpoint, index_name)
+    if cache_key in SCHEMA_CACHE:
+        return SCHEMA_CACHE[cache_key]
+    
+    cache_path = get_schema_cache_path(search_endpoint, index_name)
+    try:
+        if time.time() - cache_path.stat().st_mtime > cache_ttl:
+            return None
+        with open(cache_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    SCHEMA_CACHE[cache_key] = schema
+    return schema
+
+def save_cached_schema(search_endpoint: str, index_name: str, schema: Dict) -> None:
+    """スキーマ情報をプロセス内とキャッシュファイルに保存する（保存できなくても処理は続行）"""
+    SCHEMA_CACHE[(search_endpoint, index_name)] = schema
+    
+    cache_path = get_schema_cache_path(search_endpoint, index_name)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(schema, f, ensure_ascii=False)
+        tmp_path.replace(cache_path)
+    except OSError as e:
+        print(f"警告: スキーマキャッシュを保存できませんでした: {str(e)}")
+
 # インデックス情報の取得
-def get_index_schema(index_name: str, credential) -> Optional[Dict]:
+def get_index_schema(index_name: str, credential, cache_ttl: int = SCHEMA_CACHE_TTL) -> Optional[Dict]:
     """
     インデックスのスキーマ情報を取得する
     
@@ -228,9 +522,13 @@ def get_index_schema(index_name: str, credential) -> Optional[Dict]:
     - フィールド属性: https://learn.microsoft.com/ja-jp/azure/search/search-what-is-an-index#field-attributes
     - インデックス定義: https://learn.microsoft.com/ja-jp/azure/search/search-how-to-create-search-index
     
+    取得したスキーマ情報は ~/.cache/flexible_rag/schema/ にキャッシュされ、
+    有効期限（cache_ttl秒）内は再取得しません。
+    
     Parameters:
         index_name (str): スキーマ情報を取得するインデックスの名前
         credential: Azure認証情報
+        cache_ttl (int): スキーマキャッシュの有効期限（秒）。0以下ならキャッシュを使用しない
         
     Returns:
         Optional[Dict]: インデックスのスキーマ情報を含む辞書。失敗した場合はNone
@@ -238,18 +536,13 @@ def get_index_schema(index_name: str, credential) -> Optional[Dict]:
     try:
         search_endpoint = os.environ["AZURE_SEARCH_ENDPOINT"]
         
-        # SearchIndexClientの作成
-        if isinstance(credential, AzureKeyCredential):
-            index_client = SearchIndexClient(
-                endpoint=search_endpoint,
-                credential=credential
-            )
-        else:
-            # API Keyを使用
-            index_client = SearchIndexClient(
-                endpoint=search_endpoint,
-                credential=AzureKeyCredential(os.environ["AZURE_SEARCH_ADMIN_KEY"])
-            )
+        # キャッシュ済みのスキーマ情報があれば再利用
+        schema = load_cached_schema(search_endpoint, index_name, cache_ttl)
+        if schema is not None:
+            return schema
+        
+        # SearchIndexClientの取得（作成済みのものを再利用）
+        index_client = get_index_client(search_endpoint, credential)
         
         # インデックス情報の取得
         index = index_client.get_index(index_name)
@@ -264,51 +557,43 @@ def get_index_schema(index_name: str, credential) -> Optional[Dict]:
         }
         
         for field in index.fields:
-            # プロパティの存在を確認してから取得
-            field_info = {
-                "name": field.name,
-                "type": str(field.type),
-                "searchable": hasattr(field, "searchable") and field.searchable,
-                "retrievable": hasattr(field, "retrievable") and field.retrievable,
-                "filterable": hasattr(field, "filterable") and field.filterable,
-                "sortable": hasattr(field, "sortable") and field.sortable,
-                "facetable": hasattr(field, "facetable") and field.facetable,
-                "key": hasattr(field, "key") and field.key
-            }
+            # フィールド属性の取得（SDKのバージョンによって属性名が異なるため、候補を順に確認）
+            field_info = {"name": field.name, "type": str(field.type)}
+            for attr, attr_names in FIELD_ATTRS:
+                value = next((v for v in (getattr(field, name, None) for name in attr_names) if v is not None), None)
+                # SDKのSearchFieldは取得可否を retrievable ではなく hidden で表す（未設定ならAzureの既定どおり取得可能）
+                if value is None and attr == "retrievable":
+                    value = not getattr(field, "hidden", False)
+                field_info[attr] = bool(value)
             
-            # 代替のプロパティ名を確認
-            if not field_info["searchable"] and hasattr(field, "is_searchable"):
-                field_info["searchable"] = field.is_searchable
-            if not field_info["retrievable"] and hasattr(field, "is_retrievable"):
-                field_info["retrievable"] = field.is_retrievable
-            if not field_info["filterable"] and hasattr(field, "is_filterable"):
-                field_info["filterable"] = field.is_filterable
-            if not field_info["sortable"] and hasattr(field, "is_sortable"):
-                field_info["sortable"] = field.is_sortable
-            if not field_info["facetable"] and hasattr(field, "is_facetable"):
-                field_info["facetable"] = field.is_facetable
-            if not field_info["key"] and hasattr(field, "is_key"):
-                field_info["key"] = field.is_key
-            
-            if hasattr(field, "vector_search_dimensions") and field.vector_search_dimensions:
-                field_info["vector_search_dimensions"] = field.vector_search_dimensions
+            vector_search_dimensions = getattr(field, "vector_search_dimensions", None)
+            if vector_search_dimensions:
+                field_info["vector_search_dimensions"] = vector_search_dimensions
                 schema["has_vector_fields"] = True
             
             schema["fields"].append(field_info)
             
-            # always add to retrievable_fields by default
-            schema["retrievable_fields"].append(field.name)
+            # ベクトルフィールドは表示やプロンプトに使えないため、取得対象に含めない
+            is_vector = "vector_search_dimensions" in field_info or field_info["type"].startswith(DEFAULT_VECTOR_TYPE_PATTERN)
+            if field_info["retrievable"] and not is_vector:
+                schema["retrievable_fields"].append(field.name)
             
             if field_info["searchable"]:
                 schema["searchable_fields"].append(field.name)
         
+        # 既定のパターンでベクトルフィールドを除いたフィールド一覧（検索のたびに計算しない）
+        schema["non_vector_searchable"], schema["non_vector_retrievable"] = get_query_fields(
+            schema, DEFAULT_VECTOR_EXCLUDE_PATTERN, DEFAULT_VECTOR_TYPE_PATTERN
+        )
+        
+        save_cached_schema(search_endpoint, index_name, schema)
         return schema
     except Exception as e:
         print(f"インデックス '{index_name}' の情報取得に失敗しました: {str(e)}")
         return None
 
 # ドキュメント検索
-def search_documents(query: str, index_name: str, schema: Dict, credential, top: int = 5, vector_exclude_pattern: str = "vector", vector_type_pattern: str = "Collection(Edm.Single)") -> Dict:
+def search_documents(query: str, index_name: str, schema: Dict, credential, top: int = 5, vector_exclude_pattern: str = DEFAULT_VECTOR_EXCLUDE_PATTERN, vector_type_pattern: str = DEFAULT_VECTOR_TYPE_PATTERN, include_count: bool = False, use_vector: bool = True) -> Dict:
     """
     指定されたインデックスでドキュメントを検索する
     
@@ -323,6 +608,11 @@ def search_documents(query: str, index_name: str, schema: Dict, credential, top:
     ベクトル検索フィールドの除外:
     ベクトルフィールドは通常のテキスト検索に適さないため、フィールド名や型に基づいて
     自動的に除外されます。ベクトルフィールドの識別パターンはパラメータで調整可能です。
+    取得フィールド（select）からも除外するため、埋め込みベクトルはAzureから転送されません。
+    
+    ハイブリッド検索:
+    インデックスにベクトルフィールドがあり、AZURE_OPENAI_EMBEDDING_DEPLOYMENTが設定されている場合は、
+    クエリの埋め込みベクトルによるベクトル検索をテキスト検索と同じリクエストで実行します。
     
     API使用方法:
     1. SearchClientオブジェクトを作成
@@ -343,6 +633,9 @@ def search_documents(query: str, index_name: str, schema: Dict, credential, top:
         top (int): 返す検索結果の最大数
         vector_exclude_pattern (str): ベクトルフィールドを除外するための名前パターン
         vector_type_pattern (str): ベクトルフィールドの型パターン
+        include_count (bool): 一致したドキュメントの総数をAzureに集計させるかどうか
+            （集計には追加の処理時間がかかるため、Falseの場合は取得したドキュメント数を返す）
+        use_vector (bool): 可能な場合にハイブリッド検索（テキスト+ベクトル）を行うかどうか
         
     Returns:
         Dict: 検索結果数とドキュメントのリストを含む辞書
@@ -350,60 +643,213 @@ def search_documents(query: str, index_name: str, schema: Dict, credential, top:
     try:
         search_endpoint = os.environ["AZURE_SEARCH_ENDPOINT"]
         
-        # SearchClientの作成
-        if isinstance(credential, AzureKeyCredential):
-            search_client = SearchClient(
-                endpoint=search_endpoint,
-                index_name=index_name,
-                credential=credential
-            )
+        # SearchClientの取得（作成済みのものを再利用）
+        search_client = get_search_client(search_endpoint, index_name, credential)
+        
+        # 検索可能なフィールドと取得するフィールド（ベクトルフィールドを除外）
+        # 取得するフィールドはselectで指定し、埋め込みベクトルなど不要なフィールドをAzureから受け取らない
+        # 既定のパターンならスキーマ取得時に計算済みの一覧を使う
+        if vector_exclude_pattern == DEFAULT_VECTOR_EXCLUDE_PATTERN and vector_type_pattern == DEFAULT_VECTOR_TYPE_PATTERN:
+            searchable_fields = schema["non_vector_searchable"]
+            select_fields = schema["non_vector_retrievable"]
         else:
-            # API Keyを使用
-            search_client = SearchClient(
-                endpoint=search_endpoint,
-                index_name=index_name,
-                credential=AzureKeyCredential(os.environ["AZURE_SEARCH_ADMIN_KEY"])
-            )
+            searchable_fields, select_fields = get_query_fields(schema, vector_exclude_pattern, vector_type_pattern)
         
-        # 検索可能なフィールドの取得（ベクトルフィールドを除外）
-        searchable_fields = []
-        for field in schema["fields"]:
-            if field["searchable"] and vector_exclude_pattern.lower() not in field["name"].lower() and not field["type"].startswith(vector_type_pattern):
-                searchable_fields.append(field["name"])
+        if not select_fields:
+            print("警告: 取得可能なフィールドがすべてベクトルフィールドと判定されました。すべてのフィールドを取得します。")
+        
+        search_options = {
+            "select": select_fields or None,
+            "include_total_count": include_count,
+            "top": top
+        }
         
         if not searchable_fields:
             print("警告: 検索可能なテキストフィールドが見つかりません。すべてのフィールドで検索します。")
-            search_results = search_client.search(
-                search_text=query,
-                include_total_count=True,
-                top=top
-            )
         else:
             print(f"検索フィールド: {', '.join(searchable_fields)}")
-            # 検索の実行
-            search_results = search_client.search(
-                search_text=query,
-                search_fields=searchable_fields,
-                include_total_count=True,
-                top=top
-            )
+            search_options["search_fields"] = searchable_fields
+        
+        # ベクトルフィールドがあればハイブリッド検索（1回のリクエストでテキストとベクトルの両方を検索）
+        vector_queries = build_vector_queries(query, schema, top) if use_vector else None
+        if vector_queries:
+            search_options["vector_queries"] = vector_queries
         
-        # 結果の整形
-        documents = []
-        for result in search_results:
-            doc = {k: v for k, v in result.items() if not k.startswith('@')}
-            documents.append(doc)
+        # 検索の実行
+        search_results = search_client.search(search_text=query, **search_options)
+        
+        # 結果の整形（@search.score などのメタデータは取得フィールドに含まれないため自然に除かれる）
+        if select_fields:
+            documents = [
+                {field_name: result[field_name] for field_name in select_fields if field_name in result}
+                for result in search_results
+            ]
+        else:
+            # selectを指定しなかった場合は全フィールドが返るため、メタデータのみを除く
+            documents = [
+                {key: value for key, value in result.items() if not key.startswith("@")}
+                for result in search_results
+            ]
         
         return {
-            "count": search_results.get_count(),
+            "count": search_results.get_count() if include_count else len(documents),
             "documents": documents
         }
     except Exception as e:
         print(f"検索に失敗しました: {str(e)}")
         return {"count": 0, "documents": []}
 
+def get_display_names(field_names: List[str]) -> Dict[str, str]:
+    """フィールド名を人間が読みやすい表示名に変換した対応表を作成する（例: unit_price → Unit price）"""
+    return {field_name: field_name.replace("_", " ").capitalize() for field_name in field_names}
+
+def get_key_field(schema: Dict) -> Optional[str]:
+    """スキーマからキーフィールドの名前を取得する（ない場合はNone）"""
+    return next((field["name"] for field in schema["fields"] if field["key"]), None)
+
+def get_answer_cache_key(question: str, documents: List[Dict], schema: Dict, *params) -> str:
+    """
+    回答キャッシュのキーを計算する
+    
+    質問、インデックス名、生成パラメータ、検索結果のドキュメントキー（ソート済み）から
+    決定的なハッシュを作成します。キーフィールドがないスキーマではドキュメント全体を使用します。
+    """
+    key_field = get_key_field(schema)
+    if key_field:
+        doc_ids = sorted(str(doc.get(key_field, "")) for doc in documents)
+    else:
+        doc_ids = sorted(json.dumps(doc, ensure_ascii=False, sort_keys=True, default=str) for doc in documents)
+    
+    key_source = "\0".join([schema["name"], question, *map(str, params), *doc_ids])
+    return hashlib.sha256(key_source.encode()).hexdigest()
+
+def load_cached_answer(cache_key: str, cache_ttl: int) -> Optional[str]:
+    """有効期限内のキャッシュ済み回答を読み込む（なければNone）"""
+    if cache_ttl <= 0:
+        return None
+    
+    cache_path = ANSWER_CACHE_DIR / f"{cache_key}.json"
+    try:
+        if time.time() - cache_path.stat().st_mtime > cache_ttl:
+            return None
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)["answer"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_cached_answer(cache_key: str, answer: str) -> None:
+    """生成した回答をキャッシュファイルに保存する（保存できなくても処理は続行）"""
+    cache_path = ANSWER_CACHE_DIR / f"{cache_key}.json"
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"answer": answer}, f, ensure_ascii=False)
+        tmp_path.replace(cache_path)
+    except OSError as e:
+        print(f"警告: 回答キャッシュを保存できませんでした: {str(e)}")
+
+# プロンプトの構築
+@lru_cache(maxsize=1)
+def get_token_encoding():
+    """
+    トークン数の計算に使用するtiktokenのエンコーディングを取得する（初回のみ読み込み）
+    
+    Returns:
+        tiktoken.Encoding: エンコーディング。tiktokenが利用できない場合はNone
+    """
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception:
+        return None
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    テキストを指定したトークン数以内に切り詰める
+    
+    tiktokenが利用できない場合は1文字を1トークンとみなします
+    （日本語ではほぼ実際の値に近く、英語では安全側に切り詰めることになります）。
+    """
+    encoding = get_token_encoding()
+    if encoding is None:
+        return text if len(text) <= max_tokens else text[:max_tokens] + "..."
+    
+    token_ids = encoding.encode(text)
+    if len(token_ids) <= max_tokens:
+        return text
+    return encoding.decode(token_ids[:max_tokens]) + "..."
+
+def build_answer_messages(question: str, documents: List[Dict], schema: Dict, max_context_length: int = 1000, max_tokens: int = 500) -> List[Dict]:
+    """
+    検索結果から回答生成用のメッセージを構築する
+    
+    メッセージは固定のシステムプロンプト、情報源、質問の順に並べます。
+    情報源はキーフィールドの順、各フィールドはスキーマの順で並べるため、
+    同じ検索結果からは常に同じプロンプトが作られます。
+    
+    各フィールドはmax_context_length文字で切り詰めたうえで、モデルのコンテキスト長から
+    回答用のトークン（max_tokens）を除いた範囲に収まるよう、トークン数でも切り詰めます。
+    
+    Parameters:
+        question (str): ユーザーの質問
+        documents (List[Dict]): 検索結果のドキュメントリスト
+        schema (Dict): インデックスのスキーマ情報
+        max_context_length (int): 各フィールドの最大コンテキスト長
+        max_tokens (int): 回答として生成する最大トークン数
+        
+    Returns:
+        List[Dict]: chat.completions.createに渡すメッセージのリスト
+    """
+    # 取得可能なフィールドの抽出
+    retrievable_fields = schema["retrievable_fields"]
+    
+    # 検索結果の並び順に左右されないよう、キーフィールドの順に並べ替える
+    key_field = get_key_field(schema)
+    if key_field:
+        documents = sorted(documents, key=lambda doc: str(doc.get(key_field, "")))
+    
+    # フィールド名を人間が読みやすい形式に変換（ドキュメントごとに変換し直さない）
+    display_names = get_display_names(retrievable_fields)
+    
+    # 1フィールドあたりのトークン数の上限
+    context_tokens = int(os.environ.get("AZURE_OPENAI_CHAT_CONTEXT_TOKENS", DEFAULT_MODEL_CONTEXT_TOKENS))
+    field_count = max(1, len(documents) * len(retrievable_fields))
+    field_token_budget = max(1, (context_tokens - max_tokens - PROMPT_OVERHEAD_TOKENS) // field_count)
+    
+    # 文脈の作成
+    context = ""
+    for i, doc in enumerate(documents, 1):
+        context += f"\n--- ドキュメント {i} ---\n"
+        
+        # すべての取得可能なフィールドを表示
+        for field_name in retrievable_fields:
+            if field_name in doc:
+                value = doc[field_name]
+                
+                # 長いテキストの場合は切り詰める
+                if isinstance(value, str) and len(value) > max_context_length:
+                    value = value[:max_context_length] + "..."
+                
+                # リストや辞書の場合はJSON形式に変換
+                if isinstance(value, (list, dict)):
+                    value = JSON_TEXT_ENCODER.encode(value)
+                
+                # モデルのコンテキスト長を超えないようトークン数で切り詰める
+                if isinstance(value, str):
+                    value = truncate_to_tokens(value, field_token_budget)
+                
+                context += f"{display_names[field_name]}: {value}\n"
+    
+    # プロンプトの作成（固定部分 → 情報源 → 質問の順）
+    return [
+        {"role": "system", "content": ANSWER_SYSTEM_MESSAGE},
+        {"role": "user", "content": f"情報源:\n{context}"},
+        {"role": "user", "content": f"質問: {question}"}
+    ]
+
 # 回答生成
-def generate_answer(question: str, documents: List[Dict], schema: Dict, max_context_length: int = 1000, temperature: float = 0.7, max_tokens: int = 500) -> str:
+def generate_answer(question: str, documents: List[Dict], schema: Dict, max_context_length: int = 1000, temperature: float = 0.7, max_tokens: int = 500, cache_ttl: int = ANSWER_CACHE_TTL) -> str:
     """
     検索結果に基づいて回答を生成する
     
@@ -420,7 +866,7 @@ def generate_answer(question: str, documents: List[Dict], schema: Dict, max_cont
     1. AzureOpenAIクライアントを作成
     2. 検索結果からコンテキストを構築
     3. システムメッセージとユーザーメッセージを設定
-    4. chat.completions.createでリクエストを送信
+    4. chat.completions.createでリクエストを送信（stream_answerを使用し、断片をつなげて返す）
     
     参考:
     - Azure OpenAI Service: https://learn.microsoft.com/ja-jp/azure/ai-services/openai/
@@ -434,66 +880,41 @@ def generate_answer(question: str, documents: List[Dict], schema: Dict, max_cont
         max_context_length (int): 各フィールドの最大コンテキスト長
         temperature (float): 生成の温度パラメータ（0.0-1.0）
         max_tokens (int): 生成する最大トークン数
+        cache_ttl (int): 回答キャッシュの有効期限（秒）。0以下ならキャッシュを使用しない
         
     Returns:
         str: 生成された回答。エラーの場合はエラーメッセージ
     """
+    # 実装はストリーミング版に一本化し、届いた断片をつなげて返す
+    return "".join(stream_answer(question, documents, schema, max_context_length, temperature, max_tokens, cache_ttl))
+
+# 回答のストリーミング生成
+def stream_answer(question: str, documents: List[Dict], schema: Dict, max_context_length: int = 1000, temperature: float = 0.7, max_tokens: int = 500, cache_ttl: int = ANSWER_CACHE_TTL):
+    """
+    検索結果に基づいて回答をストリーミング生成する
+    
+    stream=Trueのリクエストを送信し、
+    生成されたテキストを届いた順に返します。回答全体の生成完了を待たずに
+    最初のトークンから表示できるため、体感の待ち時間が短くなります。
+    キャッシュ済みの回答がある場合は、OpenAIを呼び出さずにそのまま返します。
+    
+    Parameters:
+        generate_answerと同じ
+        
+    Yields:
+        str: 生成された回答の断片。エラーの場合はエラーメッセージ
+    """
     try:
-        # Azure OpenAI接続情報
-        openai_endpoint = os.environ["AZURE_OPENAI_ENDPOINT"]
-        openai_api_key = os.environ["AZURE_OPENAI_API_KEY"]
         deployment_name = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
         
-        # OpenAIクライアントの作成
-        from openai import AzureOpenAI
-        client = AzureOpenAI(
-            api_key=openai_api_key,
-            api_version="2024-02-15-preview",
-            azure_endpoint=openai_endpoint
-        )
-        
-        # 取得可能なフィールドの抽出
-        retrievable_fields = schema["retrievable_fields"]
+        cache_key = get_answer_cache_key(question, documents, schema, deployment_name, max_context_length, temperature, max_tokens)
+        answer = load_cached_answer(cache_key, cache_ttl)
+        if answer is not None:
+            yield answer
+            return
         
-        # 文脈の作成
-        context = ""
-        for i, doc in enumerate(documents, 1):
-            context += f"\n--- ドキュメント {i} ---\n"
-            
-            # すべての取得可能なフィールドを表示
-            for field_name in retrievable_fields:
-                if field_name in doc:
-                    value = doc[field_name]
-                    
-                    # 長いテキストの場合は切り詰める
-                    if isinstance(value, str) and len(value) > max_context_length:
-                        value = value[:max_context_length] + "..."
-                    
-                    # リストや辞書の場合はJSON形式に変換
-                    if isinstance(value, (list, dict)):
-                        value = json.dumps(value, ensure_ascii=False)
-                    
-                    # フィールド名を人間が読みやすい形式に変換
-                    display_name = field_name.replace("_", " ").capitalize()
-                    context += f"{display_name}: {value}\n"
-        
-        # プロンプトの作成
-        # このプロンプト設計は以下のポイントを重視:
-        # 1. 明確な役割定義: アシスタントの役割と応答範囲を明示
-        # 2. 緩やかな制約: 直接関連する情報がなくても関連推測を許可
-        # 3. クオリティ指示: 簡潔さと正確性を強調
-        system_message = f"""
-あなたは知識豊富なアシスタントです。
-以下の情報源を参考にして、ユーザーの質問に対して有益な回答を提供してください。
-情報源に直接関連する内容が見つからない場合でも、情報源から推測できる関連情報があれば提供してください。
-完全に情報がない場合のみ「情報が見つかりませんでした」と伝えてください。
-回答は日本語で提供し、簡潔かつ正確であることを心がけてください。
-
-質問: {question}
-
-情報源:
-{context}
-"""
+        # OpenAIクライアントの取得（作成済みのものを再利用）
+        client = get_openai_client()
         
         # OpenAIによる回答生成
         # パラメータの説明:
@@ -501,19 +922,26 @@ def generate_answer(question: str, documents: List[Dict], schema: Dict, max_cont
         # - messages: 会話履歴（システムメッセージとユーザーメッセージ）
         # - temperature: 出力のランダム性（0=決定的、1=創造的）
         # - max_tokens: 生成する最大トークン数
+        # - stream: 生成されたテキストを届いた順に受け取る
         response = client.chat.completions.create(
             model=deployment_name,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": "この情報から何がわかりますか？"}
-            ],
+            messages=build_answer_messages(question, documents, schema, max_context_length, max_tokens),
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            stream=True
         )
         
-        return response.choices[0].message.content
+        parts = []
+        for chunk in response:
+            # Azureではコンテンツフィルター結果のみのチャンク（choicesが空）が届くことがある
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+        
+        if cache_ttl > 0 and parts:
+            save_cached_answer(cache_key, "".join(parts))
     except Exception as e:
-        return f"OpenAIでの回答生成に失敗しました: {str(e)}\n\n以下に検索結果を表示します。"
+        yield f"OpenAIでの回答生成に失敗しました: {str(e)}\n\n以下に検索結果を表示します。"
 
 def display_documents(documents: List[Dict], schema: Dict, verbose: bool = False, summary_length: int = 300) -> None:
     """
@@ -536,31 +964,207 @@ def display_documents(documents: List[Dict], schema: Dict, verbose: bool = False
     """
     retrievable_fields = schema["retrievable_fields"]
     
+    # フィールド名を人間が読みやすい形式に変換（ドキュメントごとに変換し直さない）
+    display_names = get_display_names(retrievable_fields)
+    
+    # 1行ずつ標準出力に書き出す（全体を組み立ててから出力しない）
+    out = sys.stdout.write
     for i, doc in enumerate(documents, 1):
-        print(f"--- ドキュメント {i} ---")
+        out(f"--- ドキュメント {i} ---\n")
         
         # すべての取得可能なフィールドを表示
         for field_name in retrievable_fields:
             if field_name in doc:
                 value = doc[field_name]
                 
+                # リストや辞書の場合はJSON形式に変換
+                if isinstance(value, (list, dict)):
+                    value = JSON_TEXT_ENCODER.encode(value)
+                
                 # 長いテキストの場合は切り詰める
                 if isinstance(value, str) and not verbose and len(value) > summary_length:
                     value = value[:summary_length] + "..."
                 
-                # リストや辞書の場合はJSON形式に変換
-                if isinstance(value, (list, dict)):
-                    value_json = json.dumps(value, ensure_ascii=False)
-                    if not verbose and len(value_json) > summary_length:
-                        value = value_json[:summary_length] + "..."
-                    else:
-                        value = value_json
-                
-                # フィールド名を人間が読みやすい形式に変換
-                display_name = field_name.replace("_", " ").capitalize()
-                print(f"{display_name}: {value}")
+                out(f"{display_names[field_name]}: {value}\n")
+        
+        out("\n")
+
+def display_index_list(indexes: List[str]) -> None:
+    """インデックス一覧を番号付きで表示する"""
+    print("利用可能なインデックス一覧:")
+    for i, index_name in enumerate(indexes, 1):
+        print(f"{i}. {index_name}")
+
+def display_schema(schema: Dict, title: str) -> None:
+    """
+    インデックスのスキーマ情報を表示する
+    
+    Parameters:
+        schema (Dict): インデックスのスキーマ情報
+        title (str): 先頭に表示する見出し
+    """
+    print(title)
+    print(f"検索可能なフィールド: {', '.join(schema['searchable_fields'])}")
+    print(f"取得可能なフィールド: {', '.join(schema['retrievable_fields'])}")
+    print("\nフィールド詳細:")
+    for field in schema["fields"]:
+        print(f"- {field['name']}: {field['type']}, searchable={field['searchable']}, retrievable={field['retrievable']}")
+
+class RAGSession:
+    """
+    検索と回答生成のセッション
+    
+    認証情報・スキーマ情報・クライアントを1度だけ準備し、同じセッションの中で
+    複数の質問を処理します。質問のたびに認証やスキーマ取得、クライアントの作成を
+    やり直さないため、対話モードで続けて質問しても待ち時間が増えません。
+    
+    スキーマの取得やOpenAIクライアントの準備はバックグラウンドで先行して開始し、
+    ユーザーの入力待ちや検索の通信と重ねて待ち時間を隠します。
+    
+    Parameters:
+        credential: Azure認証情報
+        args (argparse.Namespace): コマンドライン引数
+    """
+    def __init__(self, credential, args):
+        self.credential = credential
+        self.args = args
+        self.schemas = {}
+        self.executor = ThreadPoolExecutor(max_workers=max(1, args.parallelism))
+    
+    def prefetch_schema(self, index_name: str) -> None:
+        """インデックスのスキーマ情報の取得をバックグラウンドで開始する（セッション内では1度だけ取得）"""
+        if index_name not in self.schemas:
+            self.schemas[index_name] = self.executor.submit(
+                get_index_schema, index_name, self.credential, self.args.schema_cache_ttl
+            )
+    
+    def get_schema(self, index_name: str) -> Optional[Dict]:
+        """インデックスのスキーマ情報を取得する（先行取得済みならその結果を待つ）"""
+        self.prefetch_schema(index_name)
+        return self.schemas[index_name].result()
+    
+    def select_index(self) -> Optional[str]:
+        """インデックス一覧を表示し、対話的にインデックスを選択する"""
+        indexes = list_search_indexes(self.credential)
+        if not indexes:
+            print("インデックスが見つかりませんでした。")
+            return None
+        display_index_list(indexes)
+        
+        # 選択を待つ間に一覧の先頭のいくつかのインデックスのスキーマ情報を取得しておく
+        # （インデックスが多いサービスで全件を取得しないよう件数を制限する）
+        for index_name in indexes[:SCHEMA_PREFETCH_LIMIT]:
+            self.prefetch_schema(index_name)
+        
+        while True:
+            try:
+                choice = input("\nインデックスを選択してください (番号): ")
+                index_idx = int(choice) - 1
+                if 0 <= index_idx < len(indexes):
+                    # 選択されたインデックスのスキーマ情報の取得を開始（先行取得済みなら何もしない）
+                    self.prefetch_schema(indexes[index_idx])
+                    return indexes[index_idx]
+                else:
+                    print(f"1から{len(indexes)}の範囲で選択してください。")
+            except ValueError:
+                print("数値を入力してください。")
+    
+    def ask(self, index_name: str, schema: Dict, query: str) -> None:
+        """検索を実行して結果を表示し、search_onlyでなければ回答を生成する"""
+        args = self.args
         
-        print()
+        # 検索の実行
+        search_results = search_documents(
+            query, 
+            index_name, 
+            schema, 
+            self.credential, 
+            args.top, 
+            args.vector_exclude, 
+            args.vector_type,
+            args.count,
+            not args.no_vector
+        )
+        
+        # 検索結果の表示
+        print(f"\n検索クエリ: {query}")
+        if args.count:
+            print(f"検索結果: {search_results['count']} 件\n")
+        else:
+            print(f"取得したドキュメント: {search_results['count']} 件\n")
+        
+        # ドキュメントの表示
+        display_documents(search_results["documents"], schema, args.verbose, args.summary_length)
+        
+        # ドキュメントがある場合、かつsearch_onlyでない場合は回答を生成
+        if search_results["documents"] and not args.search_only:
+            print("=== 生成された回答 ===")
+            for chunk in stream_answer(
+                query, 
+                search_results["documents"], 
+                schema, 
+                args.max_context_length, 
+                args.temperature, 
+                args.max_tokens,
+                args.answer_cache_ttl
+            ):
+                print(chunk, end="", flush=True)
+            print()
+        elif not search_results["documents"]:
+            print("関連するドキュメントが見つかりませんでした。")
+    
+    def run_interactive(self) -> None:
+        """
+        インデックスとクエリを決定して検索・回答生成を実行する
+        
+        --index が指定されていなければ対話的に選択します。--query が指定されていれば
+        1回だけ実行し、指定されていなければ空行が入力されるまで続けて質問を受け付けます。
+        """
+        try:
+            self.run_queries()
+        finally:
+            # 選択されなかったインデックスのスキーマ取得など、未着手の処理は取り消す
+            self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def run_queries(self) -> None:
+        """run_interactiveの本体"""
+        args = self.args
+        
+        # OpenAIクライアントの準備（openaiモジュールの読み込みを含む）を検索と並行して進める
+        if not args.search_only and not args.schema:
+            self.executor.submit(get_openai_client)
+        
+        # インデックスの決定（指定されていればスキーマ取得を先に開始）
+        if args.index:
+            self.prefetch_schema(args.index)
+        index_name = args.index or self.select_index()
+        if not index_name:
+            return
+        
+        # スキーマの取得
+        schema = self.get_schema(index_name)
+        if not schema:
+            return
+        
+        # スキーマのみ表示する場合
+        if args.schema:
+            display_schema(schema, f"\nインデックス '{index_name}' のスキーマ情報:")
+            return
+        
+        # コマンドラインで指定されたクエリは1回だけ実行
+        if args.query:
+            self.ask(index_name, schema, args.query)
+            return
+        
+        # 空行が入力されるまで質問を受け付ける
+        while True:
+            try:
+                query = input("\n検索クエリを入力してください（空行で終了）: ").strip()
+            except EOFError:
+                return
+            if not query:
+                return
+            self.ask(index_name, schema, query)
 
 def main():
     """
@@ -599,23 +1203,29 @@ def main():
     parser.add_argument("--top", "-t", type=int, default=3, help="検索結果の最大数")
     parser.add_argument("--verbose", "-v", action="store_true", help="詳細情報を表示")
     parser.add_argument("--search-only", "-so", action="store_true", help="検索のみ実行")
+    parser.add_argument("--count", action="store_true", help="一致したドキュメントの総数を表示")
+    parser.add_argument("--no-vector", action="store_true", help="ベクトルフィールドがあってもハイブリッド検索を行わない")
     
     # 追加の詳細オプション
     parser.add_argument("--temperature", type=float, default=0.7, help="生成モデルの温度（0.0～1.0）")
     parser.add_argument("--max-tokens", type=int, default=500, help="生成される最大トークン数")
     parser.add_argument("--max-context-length", type=int, default=1000, help="コンテキストフィールドの最大長")
     parser.add_argument("--summary-length", type=int, default=300, help="表示時のテキスト要約長")
-    parser.add_argument("--vector-exclude", type=str, default="vector", help="検索から除外するベクトルフィールドのパターン")
-    parser.add_argument("--vector-type", type=str, default="Collection(Edm.Single)", help="ベクトル型のパターン")
+    parser.add_argument("--vector-exclude", type=str, default=DEFAULT_VECTOR_EXCLUDE_PATTERN, help="検索から除外するベクトルフィールドのパターン")
+    parser.add_argument("--vector-type", type=str, default=DEFAULT_VECTOR_TYPE_PATTERN, help="ベクトル型のパターン")
+    parser.add_argument("--auth-method", choices=["auto", "key", "cli"], default="auto", help="認証方法（auto: 管理キーを優先、key: 管理キーのみ、cli: Azure CLIのみ）")
+    parser.add_argument("--parallelism", type=int, default=8, help="並列処理の数（--all-schemas でスキーマを並列に取得する数、および対話・質問処理でスキーマ先行取得などに使うスレッド数）")
+    parser.add_argument("--answer-cache-ttl", type=int, default=ANSWER_CACHE_TTL, help="回答キャッシュの有効期限（秒、0でキャッシュを使用しない）")
+    parser.add_argument("--schema-cache-ttl", type=int, default=SCHEMA_CACHE_TTL, help="スキーマキャッシュの有効期限（秒、0でキャッシュを使用しない）")
     
     args = parser.parse_args()
     
     # 環境変数の読み込み
-    if not load_environment_variables(args.env_file):
+    if not load_environment_variables(args.env_file, args.auth_method):
         return
     
     # Azure認証情報の取得
-    credential = get_azure_credentials()
+    credential = get_azure_credentials(args.auth_method)
     if not credential:
         return
     
@@ -627,254 +1237,26 @@ def main():
             print("インデックスが見つかりませんでした。")
             return
             
-        for index_name in indexes:
-            schema = get_index_schema(index_name, credential)
+        # スキーマ情報を並列に取得（クライアントは共有しても安全）し、一覧の順に表示
+        with ThreadPoolExecutor(max_workers=max(1, args.parallelism)) as executor:
+            schemas = list(executor.map(
+                lambda index_name: get_index_schema(index_name, credential, args.schema_cache_ttl),
+                indexes
+            ))
+        
+        for index_name, schema in zip(indexes, schemas):
             if schema:
-                print(f"\n===== インデックス: {index_name} =====")
-                print(f"検索可能なフィールド: {', '.join(schema['searchable_fields'])}")
-                print(f"取得可能なフィールド: {', '.join(schema['retrievable_fields'])}")
-                print("\nフィールド詳細:")
-                for field in schema["fields"]:
-                    print(f"- {field['name']}: {field['type']}, searchable={field['searchable']}, retrievable={field['retrievable']}")
+                display_schema(schema, f"\n===== インデックス: {index_name} =====")
         return
     
     # インデックス一覧の表示
     if args.list_indexes:
-        print("利用可能なインデックス一覧:")
-        indexes = list_search_indexes(credential)
-        for i, index_name in enumerate(indexes, 1):
-            print(f"{i}. {index_name}")
+        display_index_list(list_search_indexes(credential))
         return
     
-    # インデックスが指定されていない場合
-    if not args.index and not args.query:
-        # インデックス一覧を表示
-        print("利用可能なインデックス一覧:")
-        indexes = list_search_indexes(credential)
-        for i, index_name in enumerate(indexes, 1):
-            print(f"{i}. {index_name}")
-        
-        # インデックスの選択
-        while True:
-            try:
-                choice = input("\nインデックスを選択してください (番号): ")
-                index_idx = int(choice) - 1
-                if 0 <= index_idx < len(indexes):
-                    selected_index = indexes[index_idx]
-                    break
-                else:
-                    print(f"1から{len(indexes)}の範囲で選択してください。")
-            except ValueError:
-                print("数値を入力してください。")
-        
-        # スキーマの取得
-        schema = get_index_schema(selected_index, credential)
-        
-        # スキーマのみ表示する場合
-        if args.schema:
-            print(f"\nインデックス '{selected_index}' のスキーマ情報:")
-            print(f"検索可能なフィールド: {', '.join(schema['searchable_fields'])}")
-            print(f"取得可能なフィールド: {', '.join(schema['retrievable_fields'])}")
-            print("\nフィールド詳細:")
-            for field in schema["fields"]:
-                print(f"- {field['name']}: {field['type']}, searchable={field['searchable']}, retrievable={field['retrievable']}")
-            return
-        
-        # 検索クエリの入力
-        query = input("\n検索クエリを入力してください: ")
-        
-        # 検索の実行
-        search_results = search_documents(
-            query, 
-            selected_index, 
-            schema, 
-            credential, 
-            args.top, 
-            args.vector_exclude, 
-            args.vector_type
-        )
-        
-        # 検索結果の表示
-        print(f"\n検索クエリ: {query}")
-        print(f"検索結果: {search_results['count']} 件\n")
-        
-        # ドキュメントの表示
-        display_documents(search_results["documents"], schema, args.verbose, args.summary_length)
-        
-        # ドキュメントがある場合、かつsearch_onlyでない場合は回答を生成
-        if search_results["documents"] and not args.search_only:
-            print("=== 生成された回答 ===")
-            answer = generate_answer(
-                query, 
-                search_results["documents"], 
-                schema, 
-                args.max_context_length, 
-                args.temperature, 
-                args.max_tokens
-            )
-            print(answer)
-        elif not search_results["documents"]:
-            print("関連するドキュメントが見つかりませんでした。")
-    
-    # インデックスと検索クエリが指定されている場合
-    elif args.index and args.query:
-        # スキーマの取得
-        schema = get_index_schema(args.index, credential)
-        if not schema:
-            return
-        
-        # スキーマのみ表示する場合
-        if args.schema:
-            print(f"\nインデックス '{args.index}' のスキーマ情報:")
-            print(f"検索可能なフィールド: {', '.join(schema['searchable_fields'])}")
-            print(f"取得可能なフィールド: {', '.join(schema['retrievable_fields'])}")
-            print("\nフィールド詳細:")
-            for field in schema["fields"]:
-                print(f"- {field['name']}: {field['type']}, searchable={field['searchable']}, retrievable={field['retrievable']}")
-            return
-        
-        # 検索の実行
-        search_results = search_documents(
-            args.query, 
-            args.index, 
-            schema, 
-            credential, 
-            args.top, 
-            args.vector_exclude, 
-            args.vector_type
-        )
-        
-        # 検索結果の表示
-        print(f"\n検索クエリ: {args.query}")
-        print(f"検索結果: {search_results['count']} 件\n")
-        
-        # ドキュメントの表示
-        display_documents(search_results["documents"], schema, args.verbose, args.summary_length)
-        
-        # ドキュメントがある場合、かつsearch_onlyでない場合は回答を生成
-        if search_results["documents"] and not args.search_only:
-            print("=== 生成された回答 ===")
-            answer = generate_answer(
-                args.query, 
-                search_results["documents"], 
-                schema, 
-                args.max_context_length, 
-                args.temperature, 
-                args.max_tokens
-            )
-            print(answer)
-        elif not search_results["documents"]:
-            print("関連するドキュメントが見つかりませんでした。")
-    
-    # インデックスのみ指定されている場合
-    elif args.index:
-        # スキーマの取得
-        schema = get_index_schema(args.index, credential)
-        if not schema:
-            return
-        
-        # スキーマを表示
-        if args.schema:
-            print(f"\nインデックス '{args.index}' のスキーマ情報:")
-            print(f"検索可能なフィールド: {', '.join(schema['searchable_fields'])}")
-            print(f"取得可能なフィールド: {', '.join(schema['retrievable_fields'])}")
-            print("\nフィールド詳細:")
-            for field in schema["fields"]:
-                print(f"- {field['name']}: {field['type']}, searchable={field['searchable']}, retrievable={field['retrievable']}")
-            return
-        
-        # 検索クエリの入力
-        query = input("検索クエリを入力してください: ")
-        
-        # 検索の実行
-        search_results = search_documents(
-            query, 
-            args.index, 
-            schema, 
-            credential, 
-            args.top, 
-            args.vector_exclude, 
-            args.vector_type
-        )
-        
-        # 検索結果の表示
-        print(f"\n検索クエリ: {query}")
-        print(f"検索結果: {search_results['count']} 件\n")
-        
-        # ドキュメントの表示
-        display_documents(search_results["documents"], schema, args.verbose, args.summary_length)
-        
-        # ドキュメントがある場合、かつsearch_onlyでない場合は回答を生成
-        if search_results["documents"] and not args.search_only:
-            print("=== 生成された回答 ===")
-            answer = generate_answer(
-                query, 
-                search_results["documents"], 
-                schema, 
-                args.max_context_length, 
-                args.temperature, 
-                args.max_tokens
-            )
-            print(answer)
-        elif not search_results["documents"]:
-            print("関連するドキュメントが見つかりませんでした。")
-    
-    # 検索クエリのみ指定されている場合
-    elif args.query:
-        # インデックス一覧を表示
-        print("利用可能なインデックス一覧:")
-        indexes = list_search_indexes(credential)
-        for i, index_name in enumerate(indexes, 1):
-            print(f"{i}. {index_name}")
-        
-        # インデックスの選択
-        while True:
-            try:
-                choice = input("\nインデックスを選択してください (番号): ")
-                index_idx = int(choice) - 1
-                if 0 <= index_idx < len(indexes):
-                    selected_index = indexes[index_idx]
-                    break
-                else:
-                    print(f"1から{len(indexes)}の範囲で選択してください。")
-            except ValueError:
-                print("数値を入力してください。")
-        
-        # スキーマの取得
-        schema = get_index_schema(selected_index, credential)
-        
-        # 検索の実行
-        search_results = search_documents(
-            args.query, 
-            selected_index, 
-            schema, 
-            credential, 
-            args.top, 
-            args.vector_exclude, 
-            args.vector_type
-        )
-        
-        # 検索結果の表示
-        print(f"\n検索クエリ: {args.query}")
-        print(f"検索結果: {search_results['count']} 件\n")
-        
-        # ドキュメントの表示
-        display_documents(search_results["documents"], schema, args.verbose, args.summary_length)
-        
-        # ドキュメントがある場合、かつsearch_onlyでない場合は回答を生成
-        if search_results["documents"] and not args.search_only:
-            print("=== 生成された回答 ===")
-            answer = generate_answer(
-                args.query, 
-                search_results["documents"], 
-                schema, 
-                args.max_context_length, 
-                args.temperature, 
-                args.max_tokens
-            )
-            print(answer)
-        elif not search_results["documents"]:
-            print("関連するドキュメントが見つかりませんでした。")
+    # インデックスの選択から検索・回答生成までを1つのセッションで実行
+    session = RAGSession(credential, args)
+    session.run_interactive()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -4,11 +4,16 @@
 import os
 import json
 import logging
+import time
 import argparse
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Optional
+import requests
 from azure.identity import DefaultAzureCredential
-from azure.mgmt.resource import ResourceManagementClient
+from azure.mgmt.resource import ResourceManagementClient, SubscriptionClient
 from azure.mgmt.storage import StorageManagementClient
 from azure.mgmt.search import SearchManagementClient
 from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
@@ -17,6 +22,19 @@ from azure.mgmt.cognitiveservices import CognitiveServicesManagementClient
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# リソースタイプ（list_rg_resources_bulk の戻り値のキー、小文字）
+STORAGE_ACCOUNT_TYPE = 'microsoft.storage/storageaccounts'
+SEARCH_SERVICE_TYPE = 'microsoft.search/searchservices'
+COGNITIVE_ACCOUNT_TYPE = 'microsoft.cognitiveservices/accounts'
+
+# Azure Resource Manager のトークンスコープ
+MANAGEMENT_SCOPE = 'https://management.azure.com/.default'
+# トークンの有効期限がこの秒数以内に迫っていたら再取得する
+TOKEN_REFRESH_MARGIN = 300
+
+# 外部モデルへのアクセス確認のタイムアウト（秒）
+EXTERNAL_MODEL_CHECK_TIMEOUT = 10
+
 def parse_args():
     """コマンドライン引数をパースする"""
     parser = argparse.ArgumentParser(description='Azure リソースから環境変数を設定')
@@ -84,45 +102,71 @@ def parse_args():
 def load_external_config(config_path: str) -> Optional[Dict]:
     """外部設定ファイルを読み込む"""
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        logger.info(f"外部設定ファイル '{config_path}' を読み込みました")
+        # バイト列のまま渡すと json がUTF-8などを自動判別するため、ロケールの文字コードに依存しない
+        with open(config_path, 'rb') as f:
+            config = json.loads(f.read())
+        logger.info("外部設定ファイル '%s' を読み込みました", config_path)
         return config
     except Exception as e:
-        logger.error(f"外部設定ファイルの読み込みに失敗しました: {str(e)}")
+        logger.error("外部設定ファイルの読み込みに失敗しました: %s", e)
         return None
 
+@lru_cache(maxsize=1)
+def get_http_session() -> requests.Session:
+    """外部モデルの確認に使うHTTPセッションを取得する（接続を使い回す）"""
+    return requests.Session()
+
 def check_external_model(endpoint: str, api_key: str, deployment: str, api_version: str) -> bool:
     """外部モデルにアクセスできるか確認する"""
     try:
         # APIエンドポイントを構築
         full_endpoint = f"{endpoint}/openai/deployments/{deployment}/embeddings"
         
-        # curl コマンドで簡易テスト
-        test_command = (
-            f'curl {full_endpoint}?api-version={api_version} '
-            f'-H "Content-Type: application/json" '
-            f'-H "api-key: {api_key}" '
-            f'-d \'{{"input": "テストメッセージ"}}\' '
-            f'-s | grep -q "embedding"'
+        # エンベディングを1件リクエストして簡易テスト
+        response = get_http_session().post(
+            full_endpoint,
+            params={"api-version": api_version},
+            headers={"api-key": api_key},
+            json={"input": "テストメッセージ"},
+            timeout=EXTERNAL_MODEL_CHECK_TIMEOUT
         )
+        response.raise_for_status()
+        if "embedding" not in response.text:
+            raise ValueError("レスポンスにエンベディングが含まれていません")
         
-        # コマンドを実行
-        subprocess.run(test_command, shell=True, check=True, 
-                     stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        logger.info(f"✅ 外部モデル '{deployment}' にアクセスできました")
+        logger.info("✅ 外部モデル '%s' にアクセスできました", deployment)
         return True
     except Exception as e:
-        logger.warning(f"外部モデルへのアクセスに失敗しました: {str(e)}")
+        logger.warning("外部モデルへのアクセスに失敗しました: %s", e)
         return False
 
-def get_azure_clients(credential):
-    """Azure クライアントを取得する"""
-    subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID')
-    if not subscription_id:
-        raise ValueError("AZURE_SUBSCRIPTION_ID environment variable is not set")
+class SharedTokenCredential:
+    """取得したトークンを複数の管理クライアント間で共有する資格情報
+
+    管理クライアントはそれぞれ個別にトークンを取得するため、同じ資格情報を渡しても
+    クライアントの数だけ認証処理（Azure CLI の起動など）が走る。
+    スコープごとにトークンを保持し、有効期限が近づくまで使い回す。
+    """
     
+    def __init__(self, credential):
+        self.credential = credential
+        self.tokens = {}
+        self.lock = threading.Lock()
+    
+    def get_token(self, *scopes, **kwargs):
+        # クレームチャレンジなど追加条件付きの要求はキャッシュせずそのまま渡す
+        if kwargs.get('claims'):
+            return self.credential.get_token(*scopes, **kwargs)
+        
+        with self.lock:
+            token = self.tokens.get(scopes)
+            if token is None or token.expires_on - TOKEN_REFRESH_MARGIN < time.time():
+                token = self.credential.get_token(*scopes, **kwargs)
+                self.tokens[scopes] = token
+            return token
+
+def get_azure_clients(credential, subscription_id: str):
+    """Azure クライアントを取得する"""
     return {
         'resource': ResourceManagementClient(credential, subscription_id),
         'storage': StorageManagementClient(credential, subscription_id),
@@ -130,9 +174,16 @@ def get_azure_clients(credential):
         'cognitive': CognitiveServicesManagementClient(credential, subscription_id)
     }
 
-def get_storage_account(clients, resource_group: str):
+def list_rg_resources_bulk(clients, resource_group: str) -> Dict[str, list]:
+    """リソースグループ内の全リソースを1回のARM呼び出しで取得し、リソースタイプ（小文字）ごとにまとめる"""
+    resources_by_type = {}
+    for resource in clients['resource'].resources.list_by_resource_group(resource_group):
+        resources_by_type.setdefault(resource.type.lower(), []).append(resource)
+    return resources_by_type
+
+def get_storage_account(clients, resource_group: str, resources_by_type: Dict[str, list]):
     """ストレージアカウント情報を取得する"""
-    storage_accounts = list(clients['storage'].storage_accounts.list_by_resource_group(resource_group))
+    storage_accounts = resources_by_type.get(STORAGE_ACCOUNT_TYPE, [])
     if not storage_accounts:
         return None
     
@@ -144,9 +195,9 @@ def get_storage_account(clients, resource_group: str):
         'connection_string': f"DefaultEndpointsProtocol=https;AccountName={account.name};AccountKey={keys.keys[0].value};EndpointSuffix=core.windows.net"
     }
 
-def get_search_service(clients, resource_group: str):
+def get_search_service(clients, resource_group: str, resources_by_type: Dict[str, list]):
     """Cognitive Search サービス情報を取得する"""
-    services = list(clients['search'].services.list_by_resource_group(resource_group))
+    services = resources_by_type.get(SEARCH_SERVICE_TYPE, [])
     if not services:
         return None
     
@@ -158,54 +209,19 @@ def get_search_service(clients, resource_group: str):
         'key': admin_keys.primary_key
     }
 
-def get_openai_service(clients, resource_group):
+def get_openai_service(clients, resource_group, resources_by_type: Dict[str, list]):
     """OpenAIサービスの情報を取得する"""
     try:
-        # 方法1: リソースグループ内の全Cognitive Servicesアカウントを検索
-        accounts = list(clients['cognitive'].accounts.list_by_resource_group(resource_group))
+        # リソースグループ内の全Cognitive Servicesアカウントを検索
+        accounts = resources_by_type.get(COGNITIVE_ACCOUNT_TYPE, [])
         for account in accounts:
             account_name = account.name.lower()
             if account.kind == 'OpenAI' or 'openai' in account_name:
-                logger.info(f"OpenAI サービス '{account.name}' がリソースグループ内で見つかりました")
-                keys = clients['cognitive'].accounts.list_keys(resource_group, account.name)
-                endpoint = f"https://{account.name}.cognitiveservices.azure.com/"
-                
-                # デプロイメント情報の取得
-                deployments = get_openai_deployments(resource_group, account.name)
-                
-                # チャットとエンベディングモデルを識別
-                chat_model, chat_deployment, embedding_model, embedding_deployment = identify_models(deployments)
-                
-                return create_openai_info(account.name, endpoint, keys.key1, 
-                                         chat_model, chat_deployment, 
-                                         embedding_model, embedding_deployment)
-        
-        # 方法2: リソースタイプでフィルタリングして検索
-        resources = list(clients['resource'].resources.list_by_resource_group(
-            resource_group_name=resource_group,
-            filter="resourceType eq 'Microsoft.CognitiveServices/accounts'"
-        ))
-        
-        for resource in resources:
-            resource_name = resource.name.lower()
-            if (hasattr(resource, 'kind') and resource.kind == 'OpenAI') or 'openai' in resource_name:
-                logger.info(f"OpenAI サービス '{resource.name}' がリソースタイプで見つかりました")
-                cognitive_client = clients['cognitive']
-                keys = cognitive_client.accounts.list_keys(resource_group, resource.name)
-                endpoint = f"https://{resource.name}.cognitiveservices.azure.com/"
-                
-                # デプロイメント情報の取得
-                deployments = get_openai_deployments(resource_group, resource.name)
-                
-                # チャットとエンベディングモデルを識別
-                chat_model, chat_deployment, embedding_model, embedding_deployment = identify_models(deployments)
-                
-                return create_openai_info(resource.name, endpoint, keys.key1, 
-                                         chat_model, chat_deployment, 
-                                         embedding_model, embedding_deployment)
+                logger.info("OpenAI サービス '%s' がリソースグループ内で見つかりました", account.name)
+                return build_openai_info(clients, resource_group, account.name)
         
         # OpenAIサービスが見つからなかった場合
-        logger.warning(f"リソースグループ '{resource_group}' にOpenAIサービスが見つかりませんでした")
+        logger.warning("リソースグループ '%s' にOpenAIサービスが見つかりませんでした", resource_group)
         # デフォルト値を設定して返す
         return {
             'AZURE_OPENAI_SERVICE': "NOT_FOUND",
@@ -218,7 +234,7 @@ def get_openai_service(clients, resource_group):
             'AZURE_OPENAI_EMBEDDING_DEPLOYMENT': "NOT_FOUND"
         }
     except Exception as e:
-        logger.error(f"OpenAIサービスの取得中にエラーが発生しました: {str(e)}")
+        logger.error("OpenAIサービスの取得中にエラーが発生しました: %s", e)
         # エラー時もデフォルト値を返す
         return {
             'AZURE_OPENAI_SERVICE': "ERROR",
@@ -231,6 +247,23 @@ def get_openai_service(clients, resource_group):
             'AZURE_OPENAI_EMBEDDING_DEPLOYMENT': "ERROR"
         }
 
+def build_openai_info(clients, resource_group, account_name):
+    """OpenAIアカウントのキーとデプロイメント情報を取得してOpenAI情報を作成する"""
+    # キーとデプロイメントは互いに依存しないため並列に取得する
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        keys_future = executor.submit(clients['cognitive'].accounts.list_keys, resource_group, account_name)
+        deployments_future = executor.submit(get_openai_deployments, clients, resource_group, account_name)
+    keys = keys_future.result()
+    deployments = deployments_future.result()
+    endpoint = f"https://{account_name}.cognitiveservices.azure.com/"
+    
+    # チャットとエンベディングモデルを識別
+    chat_model, chat_deployment, embedding_model, embedding_deployment = identify_models(deployments)
+    
+    return create_openai_info(account_name, endpoint, keys.key1, 
+                             chat_model, chat_deployment, 
+                             embedding_model, embedding_deployment)
+
 def identify_models(deployments):
     """デプロイメントからチャットモデルとエンベディングモデルを識別する"""
     chat_model = None
@@ -245,15 +278,20 @@ def identify_models(deployments):
         if not model_name or not deployment_name:
             continue
             
+        # 小文字化はデプロイメントごとに1回だけ行う
+        name_lower = model_name.lower()
+        is_chat = 'gpt' in name_lower or 'chat' in name_lower
+        is_embedding = 'embedding' in name_lower or 'ada' in name_lower
+        
         # GPTモデルはチャット用
-        if 'gpt' in model_name.lower() or 'chat' in model_name.lower():
+        if is_chat:
             # 最新のGPTモデルを優先（簡易的な実装）
-            if not chat_model or 'gpt-4' in model_name.lower():
+            if not chat_model or 'gpt-4' in name_lower:
                 chat_model = model_name
                 chat_deployment = deployment_name
         
         # エンベディングモデル識別
-        if 'embedding' in model_name.lower() or 'ada' in model_name.lower():
+        if is_embedding:
             embedding_model = model_name
             embedding_deployment = deployment_name
     
@@ -272,51 +310,51 @@ def create_openai_info(service_name, endpoint, api_key, chat_model, chat_deploym
         'AZURE_OPENAI_EMBEDDING_DEPLOYMENT': embedding_deployment or "NOT_FOUND"
     }
 
-def get_openai_deployments(resource_group, openai_name):
+def get_openai_deployments(clients, resource_group, openai_name):
     """OpenAIサービスのデプロイメント情報を取得する"""
     try:
-        # Azure CLIを使用してデプロイメント情報を取得（SDKだと少し複雑なため）
-        cmd = f"az cognitiveservices account deployment list --name {openai_name} --resource-group {resource_group}"
-        result = subprocess.run(cmd, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        deployments = json.loads(result.stdout)
+        # Cognitive Services の管理SDKでデプロイメント情報を取得（Azure CLIの起動を待たずに済む）
+        deployments = clients['cognitive'].deployments.list(resource_group, openai_name)
         
         deployment_info = []
         for deployment in deployments:
+            model = deployment.properties.model if deployment.properties else None
             deployment_info.append({
-                'name': deployment.get('name'),
-                'model': deployment.get('properties', {}).get('model', {}).get('name'),
-                'version': deployment.get('properties', {}).get('model', {}).get('version')
+                'name': deployment.name,
+                'model': model.name if model else None,
+                'version': model.version if model else None
             })
         
         return deployment_info
     except Exception as e:
-        logger.error(f"OpenAIデプロイメント情報の取得中にエラーが発生しました: {str(e)}")
+        logger.error("OpenAIデプロイメント情報の取得中にエラーが発生しました: %s", e)
         return []
 
-def get_cognitive_services_allinone(clients, resource_group_name: str) -> Dict[str, str]:
+def get_cognitive_services_allinone(clients, resource_group_name: str, resources_by_type: Dict[str, list]) -> Dict[str, str]:
     """Cognitive Services (all-in-one) タイプのリソース情報を取得する
 
     Args:
         clients: Azure SDKのクライアント
         resource_group_name (str): リソースグループ名
+        resources_by_type (Dict[str, list]): list_rg_resources_bulk で取得したリソース
 
     Returns:
         Dict[str, str]: Cognitive Services (all-in-one) リソースの情報
     """
     try:
-        # リソースグループ内のCognitive Servicesアカウントを取得
-        accounts = list(clients['cognitive'].accounts.list_by_resource_group(resource_group_name))
+        # リソースグループ内のCognitive Servicesアカウント
+        accounts = resources_by_type.get(COGNITIVE_ACCOUNT_TYPE, [])
         
-        # CognitiveServicesタイプのリソースを探す（OpenAIタイプを除く）
-        allinone_services = [acc for acc in accounts if acc.kind == 'CognitiveServices' and acc.kind != 'OpenAI']
+        # CognitiveServicesタイプ（all-in-one）のリソースを探す（OpenAIタイプなどは kind が異なる）
+        allinone_services = [acc for acc in accounts if acc.kind == 'CognitiveServices']
         
         if not allinone_services:
-            logger.warning(f"リソースグループ '{resource_group_name}' に all-in-one タイプの Cognitive Services が見つかりませんでした")
+            logger.warning("リソースグループ '%s' に all-in-one タイプの Cognitive Services が見つかりませんでした", resource_group_name)
             return {}
         
-        # 複数ある場合は最初のリソースを使用
-        service = allinone_services[0]
-        logger.info(f"All-in-one Cognitive Services '{service.name}' が見つかりました。")
+        # 複数ある場合は最初のリソースを使用（エンドポイントは一覧に含まれないため個別に取得）
+        service = clients['cognitive'].accounts.get(resource_group_name, allinone_services[0].name)
+        logger.info("All-in-one Cognitive Services '%s' が見つかりました。", service.name)
         
         # キー情報を取得
         keys = clients['cognitive'].accounts.list_keys(resource_group_name, service.name)
@@ -328,11 +366,36 @@ def get_cognitive_services_allinone(clients, resource_group_name: str) -> Dict[s
             'kind': service.kind
         }
     except Exception as e:
-        logger.error(f"Cognitive Services (all-in-one) の取得中にエラーが発生しました: {str(e)}")
+        logger.error("Cognitive Services (all-in-one) の取得中にエラーが発生しました: %s", e)
         return {}
 
-def get_subscription_id():
-    """Azure CLIからサブスクリプションIDを取得する"""
+def fetch_resource_info(label: str, func, *args):
+    """リソース情報を取得する（失敗しても他のリソースの取得処理に影響させない）"""
+    try:
+        return func(*args)
+    except Exception as e:
+        logger.error("%sの取得中にエラーが発生しました: %s", label, e)
+        return None
+
+def get_subscription_id(credential):
+    """サブスクリプションIDを取得する
+
+    環境変数 AZURE_SUBSCRIPTION_ID → 資格情報でアクセスできるサブスクリプション（1つだけの場合）
+    → Azure CLI の既定サブスクリプション の順に確認する。
+    """
+    subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID')
+    if subscription_id:
+        return subscription_id
+    
+    # Azure CLIの起動を避けるため、まずはSDKでサブスクリプション一覧を取得する
+    try:
+        subscriptions = list(SubscriptionClient(credential).subscriptions.list())
+        if len(subscriptions) == 1:
+            return subscriptions[0].subscription_id
+        # 複数ある場合はどれを使うか決められないため、Azure CLIで選択中のものを使う
+    except Exception as e:
+        logger.warning("SDKでのサブスクリプション一覧の取得に失敗しました: %s", e)
+    
     try:
         cmd = "az account show --query id -o tsv"
         result = subprocess.run(cmd, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -345,40 +408,44 @@ def main():
     
     # 出力ファイルが既に存在し、--forceオプションが指定されていない場合はエラー
     if os.path.exists(args.output) and not args.force:
-        logger.error(f"出力ファイル '{args.output}' は既に存在します。--force オプションを使用して上書きしてください。")
+        logger.error("出力ファイル '%s' は既に存在します。--force オプションを使用して上書きしてください。", args.output)
         return 1
     
     # AzureのSDKクライアントを初期化
-    clients = {}
     try:
-        credential = DefaultAzureCredential()
-        subscription_id = get_subscription_id()
-        
-        clients = {
-            'resource': ResourceManagementClient(credential, subscription_id),
-            'storage': StorageManagementClient(credential, subscription_id),
-            'search': SearchManagementClient(credential, subscription_id),
-            'cognitive': CognitiveServicesManagementClient(credential, subscription_id)
-        }
+        credential = SharedTokenCredential(DefaultAzureCredential())
+        # 最初にトークンを取得しておき、以降の各クライアントではそれを共有する
+        # （認証に失敗する場合もここで早めにわかる）
+        credential.get_token(MANAGEMENT_SCOPE)
+        subscription_id = get_subscription_id(credential)
+        clients = get_azure_clients(credential, subscription_id)
         
-        logger.info(f"Azure SDKの初期化が完了しました")
-        logger.info(f"サブスクリプションID: {subscription_id}")
+        logger.info("Azure SDKの初期化が完了しました")
+        logger.info("サブスクリプションID: %s", subscription_id)
     except Exception as e:
-        logger.error(f"Azure SDKの初期化中にエラーが発生しました: {str(e)}")
+        logger.error("Azure SDKの初期化中にエラーが発生しました: %s", e)
         return 1
     
-    # リソースグループが存在するか確認
+    # リソースグループ内のリソースを一括で取得（リソースグループが存在しない場合はここでエラーになる）
     try:
-        clients['resource'].resource_groups.get(args.resource_group)
-        logger.info(f"リソースグループ '{args.resource_group}' が見つかりました")
+        resources_by_type = list_rg_resources_bulk(clients, args.resource_group)
+        logger.info("リソースグループ '%s' が見つかりました", args.resource_group)
     except Exception as e:
-        logger.error(f"リソースグループ '{args.resource_group}' が見つかりません: {str(e)}")
+        logger.error("リソースグループ '%s' が見つかりません: %s", args.resource_group, e)
         return 1
     
-    # 各サービスの情報を取得
-    storage = get_storage_account(clients, args.resource_group)
-    search = get_search_service(clients, args.resource_group)
-    openai = get_openai_service(clients, args.resource_group)
+    # 各サービスの情報を並列に取得（互いに依存せず、いずれもARMへの問い合わせ待ちが大半のため）
+    # 管理クライアントは読み取り操作であればスレッド間で共有できる
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        storage_future = executor.submit(fetch_resource_info, "ストレージアカウント", get_storage_account, clients, args.resource_group, resources_by_type)
+        search_future = executor.submit(fetch_resource_info, "Search サービス", get_search_service, clients, args.resource_group, resources_by_type)
+        openai_future = executor.submit(fetch_resource_info, "OpenAI サービス", get_openai_service, clients, args.resource_group, resources_by_type)
+        cognitive_future = executor.submit(fetch_resource_info, "Cognitive Services (all-in-one)", get_cognitive_services_allinone, clients, args.resource_group, resources_by_type)
+    
+    storage = storage_future.result()
+    search = search_future.result()
+    openai = openai_future.result()
+    cognitive_allinone = cognitive_future.result()
     
     # コマンドライン引数で指定された場合は、自動検出の結果より優先する
     if openai and args.chat_model:
@@ -413,87 +480,102 @@ def main():
         if config and "embedding_models" in config:
             external_models.extend(config["embedding_models"])
     
-    # 外部モデルのアクセス確認
+    # 外部モデルのアクセス確認（各エンドポイントへの確認は独立しているため並列に実行）
     valid_external_models = []
-    for model in external_models:
-        if check_external_model(
-            model["endpoint"],
-            model["api_key"],
-            model["deployment"],
-            model["api_version"]
-        ):
-            valid_external_models.append(model)
-    
-    # Cognitive Services (all-in-one) の情報を取得
-    cognitive_allinone = get_cognitive_services_allinone(clients, args.resource_group)
+    if external_models:
+        with ThreadPoolExecutor(max_workers=len(external_models)) as executor:
+            results = executor.map(
+                lambda model: check_external_model(
+                    model["endpoint"],
+                    model["api_key"],
+                    model["deployment"],
+                    model["api_version"]
+                ),
+                external_models
+            )
+            # map は入力順に結果を返すため、設定ファイルでの順序（先頭が主モデル）は保たれる
+            valid_external_models = [model for model, ok in zip(external_models, results) if ok]
     
     # 環境変数ファイルを生成
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    with open(args.output, 'w') as f:
-        # Azure環境変数
-        f.write("# Azure Environment Variables\n")
-        f.write(f"AZURE_RESOURCE_GROUP={args.resource_group}\n\n")
+    # 内容をまとめて組み立ててから1回で書き込む
+    lines = []
+    
+    # Azure環境変数
+    lines.append("# Azure Environment Variables\n")
+    lines.append(f"AZURE_RESOURCE_GROUP={args.resource_group}\n\n")
+    
+    # ストレージアカウント情報
+    if storage:
+        lines.append("# Storage Account\n")
+        lines.append(f"AZURE_STORAGE_ACCOUNT={storage['name']}\n")
+        lines.append(f"AZURE_STORAGE_KEY=\"{storage['key']}\"\n")
+        lines.append(f"AZURE_STORAGE_CONNECTION_STRING=\"{storage['connection_string']}\"\n\n")
+    
+    # Search サービス情報
+    if search:
+        lines.append("# Search Service\n")
+        lines.append(f"AZURE_SEARCH_SERVICE_NAME={search['name']}\n")
+        lines.append(f"AZURE_SEARCH_SERVICE_ENDPOINT={search['endpoint']}\n")
+        lines.append(f"AZURE_SEARCH_SERVICE_KEY={search['key']}\n")
+        lines.append(f"AZURE_SEARCH_ENDPOINT={search['endpoint']}\n")
+        lines.append(f"AZURE_SEARCH_ADMIN_KEY={search['key']}\n\n")
+    
+    # OpenAI サービス情報
+    if openai:
+        lines.append("# OpenAI Service\n")
+        lines.append(f"AZURE_OPENAI_SERVICE_NAME={openai['AZURE_OPENAI_SERVICE']}\n")
+        lines.append(f"AZURE_OPENAI_SERVICE_ENDPOINT={openai['AZURE_OPENAI_ENDPOINT']}\n")
+        lines.append(f"AZURE_OPENAI_ENDPOINT={openai['AZURE_OPENAI_ENDPOINT']}\n")
+        lines.append(f"AZURE_OPENAI_API_KEY={openai['AZURE_OPENAI_API_KEY']}\n")
+        lines.append(f"AZURE_OPENAI_API_VERSION={openai['AZURE_OPENAI_API_VERSION']}\n\n")
         
-        # ストレージアカウント情報
-        if storage:
-            f.write("# Storage Account\n")
-            f.write(f"AZURE_STORAGE_ACCOUNT={storage['name']}\n")
-            f.write(f"AZURE_STORAGE_KEY=\"{storage['key']}\"\n")
-            f.write(f"AZURE_STORAGE_CONNECTION_STRING=\"{storage['connection_string']}\"\n\n")
+        if openai['CHAT_MODEL']:
+            lines.append(f"CHAT_MODEL={openai['CHAT_MODEL']}\n")
+            lines.append(f"AZURE_OPENAI_CHAT_DEPLOYMENT={openai['AZURE_OPENAI_CHAT_DEPLOYMENT']}\n")
         
-        # Search サービス情報
-        if search:
-            f.write("# Search Service\n")
-            f.write(f"AZURE_SEARCH_SERVICE_NAME={search['name']}\n")
-            f.write(f"AZURE_SEARCH_SERVICE_ENDPOINT={search['endpoint']}\n")
-            f.write(f"AZURE_SEARCH_SERVICE_KEY={search['key']}\n")
-            f.write(f"AZURE_SEARCH_ENDPOINT={search['endpoint']}\n")
-            f.write(f"AZURE_SEARCH_ADMIN_KEY={search['key']}\n\n")
+        if openai['EMBEDDING_MODEL']:
+            lines.append(f"EMBEDDING_MODEL={openai['EMBEDDING_MODEL']}\n")
+            lines.append(f"AZURE_OPENAI_EMBEDDING_DEPLOYMENT={openai['AZURE_OPENAI_EMBEDDING_DEPLOYMENT']}\n")
         
-        # OpenAI サービス情報
-        if openai:
-            f.write("# OpenAI Service\n")
-            f.write(f"AZURE_OPENAI_SERVICE_NAME={openai['AZURE_OPENAI_SERVICE']}\n")
-            f.write(f"AZURE_OPENAI_SERVICE_ENDPOINT={openai['AZURE_OPENAI_ENDPOINT']}\n")
-            f.write(f"AZURE_OPENAI_ENDPOINT={openai['AZURE_OPENAI_ENDPOINT']}\n")
-            f.write(f"AZURE_OPENAI_API_KEY={openai['AZURE_OPENAI_API_KEY']}\n")
-            f.write(f"AZURE_OPENAI_API_VERSION={openai['AZURE_OPENAI_API_VERSION']}\n\n")
-            
-            if openai['CHAT_MODEL']:
-                f.write(f"CHAT_MODEL={openai['CHAT_MODEL']}\n")
-                f.write(f"AZURE_OPENAI_CHAT_DEPLOYMENT={openai['AZURE_OPENAI_CHAT_DEPLOYMENT']}\n")
-            
-            if openai['EMBEDDING_MODEL']:
-                f.write(f"EMBEDDING_MODEL={openai['EMBEDDING_MODEL']}\n")
-                f.write(f"AZURE_OPENAI_EMBEDDING_DEPLOYMENT={openai['AZURE_OPENAI_EMBEDDING_DEPLOYMENT']}\n")
+        lines.append("\n")
+    
+    # Cognitive Services (all-in-one) 情報
+    if cognitive_allinone:
+        lines.append("# Cognitive Services (all-in-one)\n")
+        lines.append(f"AZURE_COGNITIVE_ALLINONE_NAME={cognitive_allinone['name']}\n")
+        lines.append(f"AZURE_COGNITIVE_ALLINONE_ENDPOINT={cognitive_allinone['endpoint']}\n")
+        lines.append(f"AZURE_COGNITIVE_ALLINONE_KEY=\"{cognitive_allinone['key']}\"\n")
+        lines.append(f"AZURE_COGNITIVE_ALLINONE_KIND={cognitive_allinone['kind']}\n\n")
+    
+    # 外部モデル情報
+    if valid_external_models:
+        lines.append("# External Models\n")
+        for i, model in enumerate(valid_external_models):
+            # 最初のモデルを主なエンベディングモデルとして設定
+            if i == 0:
+                lines.append(f"EMBEDDING_MODEL={model['name']}\n")
+                lines.append(f"AZURE_OPENAI_EMBEDDING_DEPLOYMENT={model['deployment']}\n")
+                lines.append(f"EMBEDDING_API_BASE={model['endpoint']}\n")
+                lines.append(f"EMBEDDING_API_KEY={model['api_key']}\n")
+                lines.append(f"EMBEDDING_API_VERSION={model['api_version']}\n\n")
             
-            f.write("\n")
-        
-        # Cognitive Services (all-in-one) 情報
-        if cognitive_allinone:
-            f.write("# Cognitive Services (all-in-one)\n")
-            f.write(f"AZURE_COGNITIVE_ALLINONE_NAME={cognitive_allinone['name']}\n")
-            f.write(f"AZURE_COGNITIVE_ALLINONE_ENDPOINT={cognitive_allinone['endpoint']}\n")
-            f.write(f"AZURE_COGNITIVE_ALLINONE_KEY=\"{cognitive_allinone['key']}\"\n")
-            f.write(f"AZURE_COGNITIVE_ALLINONE_KIND={cognitive_allinone['kind']}\n\n")
-        
-        # 外部モデル情報
-        if valid_external_models:
-            f.write("# External Models\n")
-            for i, model in enumerate(valid_external_models):
-                # 最初のモデルを主なエンベディングモデルとして設定
-                if i == 0:
-                    f.write(f"EMBEDDING_MODEL={model['name']}\n")
-                    f.write(f"AZURE_OPENAI_EMBEDDING_DEPLOYMENT={model['deployment']}\n")
-                    f.write(f"EMBEDDING_API_BASE={model['endpoint']}\n")
-                    f.write(f"EMBEDDING_API_KEY={model['api_key']}\n")
-                    f.write(f"EMBEDDING_API_VERSION={model['api_version']}\n\n")
-                
-                # 言語別モデルの設定
-                for lang in model.get("languages", []):
-                    f.write(f"AZURE_OPENAI_EMBEDDING_{lang.upper()}={model['deployment']}\n")
-    
-    logger.info(f"環境変数ファイル '{args.output}' を生成しました")
+            # 言語別モデルの設定
+            for lang in model.get("languages", []):
+                lines.append(f"AZURE_OPENAI_EMBEDDING_{lang.upper()}={model['deployment']}\n")
+    
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    # APIキーを含むため、新規作成時は所有者のみ読み書きできる権限（0o600）にする
+    payload = "".join(lines).encode("utf-8")
+    fd = os.open(args.output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        # os.write は一部しか書き込まない場合があるため、残りがなくなるまで繰り返す
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    
+    logger.info("環境変数ファイル '%s' を生成しました", args.output)
     return 0
 
 if __name__ == '__main__':
@@ -33,6 +33,8 @@ import os
 import sys
 import json
 import argparse
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents import SearchClient
@@ -47,7 +49,69 @@ from azure.search.documents import SearchClient
 # - AZURE_OPENAI_CHAT_DEPLOYMENT: デプロイしたモデルの名前
 load_dotenv()
 
-def search_documents(query, index_name, top=5):
+@lru_cache(maxsize=None)
+def get_search_client(index_name):
+    """
+    インデックスごとの検索クライアントを取得する
+    
+    クライアントは内部でHTTP接続を保持しているため、一度作成したものを使い回します。
+    
+    Parameters:
+        index_name (str): 検索するインデックス名
+        
+    Returns:
+        SearchClient: 検索クライアント
+    """
+    # Azure AI Search接続情報
+    search_endpoint = os.environ["AZURE_SEARCH_ENDPOINT"]
+    search_key = os.environ["AZURE_SEARCH_ADMIN_KEY"]
+    
+    # 検索クライアントの作成
+    # AzureKeyCredentialはAzure SDKで認証に使用される共通クラス
+    return SearchClient(
+        endpoint=search_endpoint,
+        index_name=index_name,
+        credential=AzureKeyCredential(search_key)
+    )
+
+@lru_cache(maxsize=1)
+def get_openai_client():
+    """
+    Azure OpenAIクライアントを取得する
+    
+    検索クライアントと同様に、一度作成したクライアントを使い回します。
+    
+    Returns:
+        AzureOpenAI: Azure OpenAIクライアント
+    """
+    # Azure OpenAI接続情報
+    openai_endpoint = os.environ["AZURE_OPENAI_ENDPOINT"]
+    openai_api_key = os.environ["AZURE_OPENAI_KEY"]
+    
+    # OpenAIクライアントの作成
+    # API バージョンは定期的に更新されるため、最新のものを確認することをお勧めします
+    # https://learn.microsoft.com/ja-jp/azure/ai-services/openai/reference#rest-api-versioning
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_key=openai_api_key,
+        api_version="2024-02-15-preview",
+        azure_endpoint=openai_endpoint
+    )
+
+def prewarm_openai_client():
+    """
+    Azure OpenAIへの接続を事前に確立する
+    
+    最初のリクエストではDNS解決やTLSハンドシェイクに時間がかかるため、
+    検索の実行中に軽いリクエスト（モデル一覧の取得）を送って接続を用意しておきます。
+    失敗しても回答生成時に改めて接続するだけなので、エラーは無視します。
+    """
+    try:
+        get_openai_client().models.list()
+    except Exception:
+        pass
+
+def search_documents(query, index_name, top=5, include_count=False):
     """
     Azure AI Searchでドキュメントを検索する
     
@@ -55,7 +119,7 @@ def search_documents(query, index_name, top=5):
     高度な検索機能を提供するマネージドサービスです。
     
     API使用方法：
-    1. SearchClientオブジェクトを作成して検索エンドポイントに接続
+    1. SearchClientオブジェクトを取得して検索エンドポイントに接続
     2. search()メソッドでクエリを実行
     3. 検索結果を処理
     
@@ -67,41 +131,35 @@ def search_documents(query, index_name, top=5):
         query (str): 検索するテキスト
         index_name (str): 検索するインデックス名
         top (int): 返す検索結果の最大数
+        include_count (bool): 一致した全件数を取得するかどうか
+            （サーバー側で件数の集計が必要になるため、既定では取得しない）
         
     Returns:
         dict: 検索結果数と検索されたドキュメントのリスト
+            （include_count=False の場合、検索結果数は返されたドキュメントの数）
     """
-    # Azure AI Search接続情報
-    search_endpoint = os.environ["AZURE_SEARCH_ENDPOINT"]
-    search_key = os.environ["AZURE_SEARCH_ADMIN_KEY"]
-    
-    # 検索クライアントの作成
-    # AzureKeyCredentialはAzure SDKで認証に使用される共通クラス
-    search_client = SearchClient(
-        endpoint=search_endpoint,
-        index_name=index_name,
-        credential=AzureKeyCredential(search_key)
-    )
+    # 検索クライアントの取得
+    search_client = get_search_client(index_name)
     
     # 検索の実行
     # search_fields: どのフィールドを検索対象とするか指定
+    # select: 結果として返すフィールドを指定（不要なフィールドを転送しない）
     # include_total_count: 合計結果数を含めるかどうか
     # top: 返す結果の最大数
     search_results = search_client.search(
         search_text=query,
         search_fields=["name", "description", "category", "brand"],
-        include_total_count=True,
+        select=["name", "price", "category", "brand", "description"],
+        include_total_count=include_count,
         top=top
     )
     
-    # 検索結果をリストに変換（メタデータフィールドを除外）
-    documents = []
-    for result in search_results:
-        doc = {k: v for k, v in result.items() if not k.startswith('@')}
-        documents.append(doc)
+    # 検索結果をリストに変換
+    # （@search.score などのメタデータも含まれるが、表示や回答生成では使用しない）
+    documents = [dict(result) for result in search_results]
     
     return {
-        "count": search_results.get_count(),
+        "count": search_results.get_count() if include_count else len(documents),
         "documents": documents
     }
 
@@ -116,7 +174,7 @@ def generate_answer(question, documents):
     マネージドサービスです。GPT-4、GPT-3.5などのモデルを安全に利用できます。
     
     API使用方法：
-    1. AzureOpenAIクライアントを作成
+    1. AzureOpenAIクライアントを取得
     2. システムメッセージとユーザーメッセージを設定
     3. chat.completions.createでリクエストを送信
     
@@ -133,36 +191,27 @@ def generate_answer(question, documents):
         str: 生成された回答テキスト
     """
     try:
-        # Azure OpenAI接続情報
-        openai_endpoint = os.environ["AZURE_OPENAI_ENDPOINT"]
-        openai_api_key = os.environ["AZURE_OPENAI_KEY"]
+        # デプロイ名とOpenAIクライアントの取得
         deployment_name = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT"]
-        
-        # OpenAIクライアントの作成
-        # API バージョンは定期的に更新されるため、最新のものを確認することをお勧めします
-        # https://learn.microsoft.com/ja-jp/azure/ai-services/openai/reference#rest-api-versioning
-        from openai import AzureOpenAI
-        client = AzureOpenAI(
-            api_key=openai_api_key,
-            api_version="2024-02-15-preview",
-            azure_endpoint=openai_endpoint
-        )
+        client = get_openai_client()
         
         # 文脈の作成
         # 検索結果をLLMに提供するコンテキストとして整形
         # これがRAGの重要な部分で、外部知識をLLMに注入します
-        context = ""
+        # 文字列の連結を繰り返すと毎回コピーが発生するため、リストに集めて最後に結合します
+        parts = []
         for i, doc in enumerate(documents, 1):
-            context += f"\n--- 商品 {i} ---\n"
-            context += f"商品名: {doc.get('name', '')}\n"
-            context += f"価格: ${doc.get('price', '')}\n"
-            context += f"カテゴリ: {doc.get('category', '')}\n"
-            context += f"ブランド: {doc.get('brand', '')}\n"
+            parts.append(f"\n--- 商品 {i} ---\n")
+            parts.append(f"商品名: {doc.get('name', '')}\n")
+            parts.append(f"価格: ${doc.get('price', '')}\n")
+            parts.append(f"カテゴリ: {doc.get('category', '')}\n")
+            parts.append(f"ブランド: {doc.get('brand', '')}\n")
             description = doc.get("description", "")
             # 長い場合は切り詰める
             if len(description) > 1000:
                 description = description[:1000] + "..."
-            context += f"説明: {description}\n"
+            parts.append(f"説明: {description}\n")
+        context = "".join(parts)
         
         # プロンプトの作成
         # システムメッセージでAIの役割と制約を設定
@@ -232,23 +281,30 @@ def main():
     args = parser.parse_args()
     
     # 検索の実行
-    search_results = search_documents(args.query, args.index, args.top)
+    # 回答を生成する場合は、検索と並行してOpenAIへの接続を準備しておく
+    if not args.search_only:
+        threading.Thread(target=prewarm_openai_client, daemon=True).start()
+    
+    # 一致した全件数は詳細表示の場合のみ取得する
+    search_results = search_documents(args.query, args.index, args.top, include_count=args.verbose)
     
     # 検索結果の表示
     print(f"検索クエリ: {args.query}")
     print(f"検索結果: {search_results['count']} 件\n")
     
-    # 詳細表示
+    # 詳細表示（まとめて組み立ててから1回で出力）
+    parts = []
     for i, doc in enumerate(search_results["documents"], 1):
-        print(f"--- ドキュメント {i} ---")
-        print(f"商品名: {doc.get('name', 'N/A')}")
-        print(f"価格: ${doc.get('price', 'N/A')}")
-        print(f"カテゴリ: {doc.get('category', 'N/A')}")
-        print(f"ブランド: {doc.get('brand', 'N/A')}")
+        parts.append(f"--- ドキュメント {i} ---\n")
+        parts.append(f"商品名: {doc.get('name', 'N/A')}\n")
+        parts.append(f"価格: ${doc.get('price', 'N/A')}\n")
+        parts.append(f"カテゴリ: {doc.get('category', 'N/A')}\n")
+        parts.append(f"ブランド: {doc.get('brand', 'N/A')}\n")
         description = doc.get("description", "")
         if not args.verbose and len(description) > 300:
             description = description[:300] + "..."
-        print(f"説明: {description}\n")
+        parts.append(f"説明: {description}\n\n")
+    sys.stdout.write("".join(parts))
     
     # ドキュメントがある場合、かつsearch_onlyでない場合は回答を生成
     if search_results["documents"] and not args.search_only: